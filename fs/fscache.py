@@ -0,0 +1,147 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class FsEntryCache:
+    """
+    Cache on disk of the decompressed entries of the archives, so an entry that didn't change is decompressed only once
+    across runs.
+    The key of an entry is the hash of its compressed data and of its FI info (unpacked size and compression).
+    The location in the FS is not part of the key, as moving an entry doesn't change its content.
+    Each file of the cache starts with the hash of the decompressed data, checked at each read, so a corrupted file is
+    removed instead of being used.
+    When the cache is bigger than its max size, the least recently used files are removed.
+    The cache can be shared by archives analysed in several threads.
+    """
+    FILE_EXTENSION = ".lzscache"
+    DIGEST_SIZE = hashlib.sha256().digest_size
+
+    def __init__(self, cache_folder_path: str, max_size=1024 * 1024 * 1024):
+        """
+        :param cache_folder_path: The folder of the cache, created if it doesn't exist
+        :param max_size: The max size in bytes of all the files of the cache
+        """
+        self._cache_folder_path = cache_folder_path
+        self._max_size = max_size
+        self._file_dict = OrderedDict()  # Key to size, from the least to the most recently used
+        self._total_size = 0
+        self.nb_hit = 0
+        self.nb_miss = 0
+        self._lock = threading.RLock()
+        os.makedirs(cache_folder_path, exist_ok=True)
+        self.__scan_folder()
+
+    def __str__(self):
+        return f"FsEntryCache(folder:{self._cache_folder_path}, size:{self._total_size}/{self._max_size}, hit:{self.nb_hit}, miss:{self.nb_miss})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __scan_folder(self):
+        file_list = []  # (last use time, key, size)
+        for sub_folder in os.scandir(self._cache_folder_path):
+            if not sub_folder.is_dir():
+                continue
+            for file in os.scandir(sub_folder.path):
+                if file.name.endswith(self.FILE_EXTENSION):
+                    stat = file.stat()
+                    file_list.append((stat.st_mtime, file.name[:-len(self.FILE_EXTENSION)], stat.st_size))
+        for _, key, size in sorted(file_list):
+            self._file_dict[key] = size
+            self._total_size += size
+
+    @staticmethod
+    def compute_key(compressed_data: bytes, length_unpack_file: int, compression_used: bool) -> str:
+        """
+        Compute the key of an entry
+        :param compressed_data: The data of the entry in the FS
+        :param length_unpack_file: The size of the entry once decompressed, from the FI
+        :param compression_used: The compression from the FI
+        :return: The key, as a hexadecimal string
+        """
+        key_hash = hashlib.sha256(compressed_data)
+        key_hash.update(struct.pack("<I?", length_unpack_file, compression_used))
+        return key_hash.hexdigest()
+
+    def _get_file_path(self, key: str) -> str:
+        return os.path.join(self._cache_folder_path, key[:2], key + self.FILE_EXTENSION)
+
+    def get(self, key: str) -> bytes | None:
+        """
+        Give the decompressed data of an entry
+        :param key: The key of the entry, from compute_key
+        :return: The decompressed data, None if not in the cache or corrupted
+        """
+        with self._lock:
+            file_path = self._get_file_path(key)
+            try:
+                with open(file_path, "rb") as file:
+                    file_data = file.read()
+            except FileNotFoundError:
+                self._forget(key)
+                self.nb_miss += 1
+                return None
+            data = file_data[self.DIGEST_SIZE:]
+            if hashlib.sha256(data).digest() != file_data[:self.DIGEST_SIZE]:
+                print(f"Corrupted cache file removed: {file_path}")
+                self._remove(key)
+                self.nb_miss += 1
+                return None
+            os.utime(file_path)  # The modification time is the last use, for the next runs
+            if key not in self._file_dict:  # Added by another process
+                self._file_dict[key] = len(file_data)
+                self._total_size += len(file_data)
+            self._file_dict.move_to_end(key)
+            self.nb_hit += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        """
+        Add the decompressed data of an entry, removing the least recently used ones if the cache is too big
+        :param key: The key of the entry, from compute_key
+        :param data: The decompressed data
+        """
+        with self._lock:
+            file_size = self.DIGEST_SIZE + len(data)
+            if file_size > self._max_size:
+                return
+            file_path = self._get_file_path(key)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            # Written in a temporary file first so another process never reads a half written file
+            file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(hashlib.sha256(data).digest())
+                file.write(data)
+            os.replace(temp_path, file_path)
+            self._forget(key)
+            self._file_dict[key] = file_size
+            self._total_size += file_size
+            self._evict()
+
+    def clear(self):
+        """Remove all the files of the cache"""
+        with self._lock:
+            for key in list(self._file_dict):
+                self._remove(key)
+
+    def get_size(self) -> int:
+        return self._total_size
+
+    def _forget(self, key: str):
+        if key in self._file_dict:
+            self._total_size -= self._file_dict.pop(key)
+
+    def _remove(self, key: str):
+        self._forget(key)
+        try:
+            os.remove(self._get_file_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._total_size > self._max_size:
+            self._remove(next(iter(self._file_dict)))  # The least recently used
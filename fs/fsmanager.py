@@ -1,13 +1,23 @@
+import asyncio
 import glob
 import inspect
+import mmap
 import os
 import pathlib
+import struct
+import sys
+import threading
 import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Generator
+from multiprocessing import resource_tracker, shared_memory
+from typing import AsyncGenerator, Generator
 
-from fs.lzs import Lzs
+from fs.fscache import FsEntryCache
+from fs.lzs import Lzs, LzsDecoder
 
 
 class FsFileType(Enum):
@@ -27,6 +37,125 @@ class FiSingleData:
     compression_used: bool
 
 
+class FiTable:
+    """
+    The FI of an archive, stored by column (one array of unsigned int for each field) instead of one object by entry.
+    The whole FI is decoded at once, and a FiSingleData is only created when an entry is accessed.
+    """
+
+    def __init__(self, fi_data: bytes = b""):
+        """
+        :param fi_data: The content of a FI file, 3 little endian unsigned int of 4 bytes for each entry
+        """
+        fi_data = fi_data[:len(fi_data) - len(fi_data) % 12]
+        if array("I").itemsize == 4:
+            value_array = array("I", fi_data)
+            if sys.byteorder == "big":
+                value_array.byteswap()
+        else:
+            value_array = array("L", (value for entry in struct.iter_unpack("<III", fi_data) for value in entry))
+        self.length_unpack_file_array = value_array[0::3]
+        self.packed_file_location_array = value_array[1::3]
+        self.compression_used_array = value_array[2::3]
+
+    def __str__(self):
+        return f"FiTable(nb_entry:{len(self)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.length_unpack_file_array)
+
+    def __getitem__(self, index: int | slice) -> FiSingleData | list[FiSingleData]:
+        if isinstance(index, slice):  # A list, as when the FI was a list of FiSingleData
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return FiSingleData(self.length_unpack_file_array[index], self.packed_file_location_array[index],
+                            bool(self.compression_used_array[index]))
+
+    def __iter__(self):
+        for length_unpack_file, packed_file_location, compression_used in zip(
+                self.length_unpack_file_array, self.packed_file_location_array, self.compression_used_array):
+            yield FiSingleData(length_unpack_file, packed_file_location, bool(compression_used))
+
+    def __eq__(self, other):
+        if isinstance(other, (FiTable, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+
+@dataclass
+class PackedEntry:
+    """An entry already in the FS format (compressed or not), written as is in a new archive"""
+    length_unpack_file: int
+    packed_data: bytes
+    compression_used: bool
+
+
+def _open_worker_shared_memory(shared_memory_name: str) -> shared_memory.SharedMemory:
+    """
+    Open the shared memory created by the archive, without registering it in the resource tracker: only the archive
+    removes it, else the tracker would report it as leaked and try to remove it again.
+    Before Python 3.13 there is no track parameter, and unregistering after opening is not possible: with fork, the
+    process may share the tracker of the archive (the registration of the archive would be removed) or have its own
+    one (started if the pool was created before the tracker), so the registration is skipped instead.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=shared_memory_name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=shared_memory_name)
+    finally:
+        resource_tracker.register = register
+
+
+def _decode_shared_entry_list(task: (str | None, str | None, list[(int, int, int)])) -> list[bytearray]:
+    """
+    Decompress a chunk of entries in a process decoding in parallel. The FS is opened from the shared memory (or mapped
+    from its file) for this chunk only, so a pool shared by several archives doesn't keep the FS of each archive.
+    """
+    shared_memory_name, fs_path, entry_list = task
+    if shared_memory_name:
+        fs_source = _open_worker_shared_memory(shared_memory_name)
+        fs_view = fs_source.buf
+    else:
+        with open(fs_path, "rb") as file:
+            fs_source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        fs_view = memoryview(fs_source)
+    try:
+        return [Lzs().decode_to_bytes(fs_view[start_data:end_data], length_unpack_file) for start_data, end_data, length_unpack_file in entry_list]
+    finally:
+        fs_view.release()
+        fs_source.close()
+
+
+def _read_file_by_block(file_path: str, start: int, end: int, block_size: int) -> Generator[bytes, None, None]:
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        remaining_size = end - start
+        while remaining_size > 0:
+            block = file.read(min(block_size, remaining_size))
+            if not block:
+                break
+            remaining_size -= len(block)
+            yield block
+
+
+def _extract_file_entry(task: (str, int, int, bool, str, int)) -> str:
+    fs_path, start_data, end_data, compression_used, dest_path, block_size = task
+    decoder = LzsDecoder() if compression_used else None
+    with open(dest_path, "wb") as file:
+        for block in _read_file_by_block(fs_path, start_data, end_data, block_size):
+            file.write(decoder.feed(block) if decoder else block)
+    return dest_path
+
+
+def _encode_entry(task: (bytes, str, str)) -> bytearray:
+    data, level, parsing = task
+    return Lzs().encode(data, level=level, parsing=parsing)
+
+
 class Archive:
     """
     An archive is a composition of 3 files: FS, FI and FL.
@@ -47,23 +176,39 @@ class Archive:
     FILE_NAME_STR_LIST = ("main", "menu", "world", "field", "magic", "battle")
     FILE_NAME_LIST = (FsFileType.MAIN, FsFileType.MENU, FsFileType.WORLD, FsFileType.FIELD, FsFileType.MAGIC, FsFileType.BATTLE)
     OFFSET_SIZE = 4
+    INDEX_EXTENSION = ".fsindex"
+    INDEX_MAGIC = b"FSIX"
+    INDEX_VERSION = 1
+    # Magic, version, size and modification time of the FS, FI and FL, number of files, size of FI and FL, number of nested archives
+    INDEX_HEADER = struct.Struct("<4sI6QIIII")
 
-    def __init__(self, fs_path: str, fi_path: str, fl_path: str):
+    def __init__(self, fs_path: str, fi_path: str, fl_path: str, verbose=True):
         """
         The different path contains the name of the file
+        :param verbose: If False, the creation is not printed (used for the nested archives, as there can be hundreds)
         """
         # Raw data
         self._fs_path = fs_path
         self._fi_path = fi_path
         self._fl_path = fl_path
         self._fs_data = bytearray()
+        self._fs_view = None  # Read-only view over the FS data, to slice the entries without copying them
         self._fi_data = bytearray()
         self._fl_data = []
         self.lzs = Lzs()
+        self._cache = None
+        self._entry_lru = OrderedDict()  # Index to decompressed data of the last entries given by get_entry
+        self._entry_lru_size = 0
+        self._lock = threading.RLock()  # For the entry LRU and the first FI/FL analysis, when used by several threads
+        self._replaced_entry_dict = {}  # Index to new data of the entries replaced since the last repack
+        self._index_path = None  # Path of the index sidecar, None to not use one
+        self._entry_key_list = None  # Cache key of each entry, from the index sidecar
+        self._nested_triple_list = []  # (path without extension, fs index, fi index, fl index) of each nested archive
 
         # Data analysed now
         self.name = pathlib.Path(fs_path).name.replace(".fs", "")
-        print(f"Creating archive for {self.name}")
+        if verbose:
+            print(f"Creating archive for {self.name}")
         if self.name not in self.FILE_NAME_STR_LIST:
             # print(f"Type unknown, probably from nested archive: {self.name}")
             self.type = FsFileType.UNKNOWN
@@ -72,9 +217,17 @@ class Archive:
 
         # Data analysed later
         self._fl_data_list = []
+        self._fl_index_dict = {}  # Lowered FL path to index
+        # Lowered FL path and name (last element of the path) to list of (archive, index), for this archive and the nested ones
+        # Built at the first lookup (None until then)
+        self._merged_path_index_dict = None
+        self._merged_name_index_dict = None
         self._fs_data_list = []
-        self._fi_data_list = []
+        self._fi_data_list = FiTable()
         self._archive_list = [] # For nested archive
+        self._nested = False  # If the nested archives are registered when analysing the FL
+        # For a nested archive, the archive containing it and the index of its fs, fi and fl entries
+        self._nested_source = None
         self._nb_file = 0
         self._fs_file_size = 0
 
@@ -100,15 +253,63 @@ class Archive:
         """
         return cls(os.path.join(folder_path, name + ".fs"), os.path.join(folder_path, name + ".fi"), os.path.join(folder_path, name + ".fl"))
 
-    def load_data(self):
+    def set_cache(self, cache: FsEntryCache | None):
+        """
+        Use a cache on disk for the decompressed entries. With a cache, the analysis decompresses all the entries
+        in advance (the FS data is then bytes and no more generator), but the entries already in the cache are just read.
+        :param cache: The cache to use, None to stop using one
+        """
+        self._cache = cache
+
+    def get_default_index_path(self) -> str:
+        return os.path.splitext(self._fs_path)[0] + self.INDEX_EXTENSION
+
+    def set_index_path(self, index_path: str | None):
+        """
+        Use an index sidecar: a binary file with the FI, the FL, the nested archives and the cache key of each entry,
+        read at once instead of parsing the FI and FL again. It is written at the first analysis of the FI/FL, and
+        written again when the size or modification time of the FS, FI or FL changed.
+        Writing it reads the whole FS once, to compute the cache keys.
+        :param index_path: The path of the sidecar (get_default_index_path gives one next to the FS), None to not use one
+        """
+        self._index_path = index_path
+
+    def load_data(self, use_mmap=False):
         """
         Read all data in memory
         No error management if the file path are invalid
+        :param use_mmap: If True, the FS is not read but memory mapped (read-only): only the parts used are read
+        from the disk, and several processes using the same archive share the same memory (the system cache)
         """
+        self.unload_data()
+        self._load_fs_data(use_mmap)
+        self._load_fi_fl_data()
+
+    def _load_fs_data(self, use_mmap=False):
+        """Read the FS in memory, from its file or from the archive containing it for a nested archive"""
+        if self._nested_source is not None:
+            parent_archive, fs_index, _, _ = self._nested_source
+            self._fs_data = parent_archive.get_entry(fs_index)
+            return
         with open(self._fs_path, "rb") as file:
-            self._fs_data.extend(file.read())
+            fs_size = os.fstat(file.fileno()).st_size
+            if use_mmap and fs_size > 0:  # An empty file can't be mapped
+                self._fs_data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Read directly in the final buffer to avoid a temporary copy of the whole FS
+                self._fs_data = bytearray(fs_size)
+                file.readinto(self._fs_data)
+
+    def _load_fi_fl_data(self):
+        """Read only the FI and FL in memory, as they are enough to know the content of the archive"""
+        self._fi_data_list = FiTable()
+        if self._nested_source is not None:
+            parent_archive, _, fi_index, fl_index = self._nested_source
+            self._fi_data = bytes(parent_archive.get_entry(fi_index))
+            self._fl_data = bytes(parent_archive.get_entry(fl_index)).decode(encoding="utf8").splitlines()
+            return
         with open(self._fi_path, "rb") as file:
-            self._fi_data.extend(file.read())
+            self._fi_data = bytearray(file.read())
         with open(self._fl_path, "r", encoding="utf8") as file:
             self._fl_data = file.read().splitlines()
 
@@ -116,106 +317,539 @@ class Archive:
         self._fs_data = fs_data
         self._fi_data = bytes(fi_data)
         self._fl_data = bytes(fl_data).decode(encoding="utf8").splitlines()
+        self._fi_data_list = FiTable()
 
     def unload_data(self):
         """Removing the data from memory"""
+        self._entry_lru.clear()
+        self._fs_view = None
+        if isinstance(self._fs_data, mmap.mmap):
+            try:
+                self._fs_data.close()
+            except BufferError:  # Entries still used, the mapping is closed when they are no more used
+                pass
         self._fs_data = bytearray()
         self._fi_data = bytearray()
         self._fl_data = bytearray()
 
-    def analyse_data(self, nested=False):
+    def analyse_data(self, nested=False, workers=1, executor: ProcessPoolExecutor = None):
         """
         Analysing the data already loaded
         If no data have been loaded, the data is loaded on itself
         First the Fl file is analysed, then the Fi then the Fs
-        :param nested: If True, the sub archive will be analysed
+        :param nested: If True, the sub archives are registered. They are only descriptors: their data is decompressed
+        and analysed only when a lookup or an iteration reaches them.
+        :param workers: If more than 1, all the compressed data is decompressed in advance by this number of processes
+        (the FS data is then bytes and no more generator). As processes are used, the calling script needs
+        the if __name__ == "__main__" guard on Windows.
+        :param executor: With more than 1 worker, a pool of processes to use instead of creating one
         """
         # Checking if data have been loaded previously
-        if not self._fs_data or not self._fi_data or not self._fl_data:
+        if self._nested_source is not None:
+            # Only what is missing is read from the parent archive, the FI/FL may have been read for the lookups
+            if not self._fs_data:
+                self._load_fs_data()
+            if not self._fi_data or not self._fl_data:
+                self._load_fi_fl_data()
+        elif not self._fs_data or not self._fi_data or not self._fl_data:
             print("Wasn't loaded")
-            self.load_data()
-        # For FL, the data is already a list of text
-        self._fl_data_list = self._fl_data
-        self._nb_file = len(self._fl_data_list)
-        # FI analyse
-        for current_offset in range(0, len(self._fi_data), 3 * self.OFFSET_SIZE):
-            length_unpack_file = int.from_bytes(self._fi_data[current_offset:current_offset + self.OFFSET_SIZE], byteorder="little")
-            packed_file_location = int.from_bytes(self._fi_data[current_offset + self.OFFSET_SIZE:current_offset + self.OFFSET_SIZE * 2], byteorder="little")
-            compression_used = bool(
-                int.from_bytes(self._fi_data[current_offset + self.OFFSET_SIZE * 2:current_offset + self.OFFSET_SIZE * 3], byteorder="little"))
-            self._fi_data_list.append(FiSingleData(length_unpack_file, packed_file_location, compression_used))
+            if not self._fi_data or not self._fl_data:
+                # Analysed again below, reading the FI and FL from the index sidecar if there is a valid one
+                self._fi_data_list = FiTable()
+            if not self._fs_data:
+                self._load_fs_data()
+        if not self._fi_data_list or self._nested != nested:
+            self._nested = nested
+            self._analyse_fi_fl()
         # FS analyse
         if inspect.isgenerator(self._fs_data):
             self._fs_data = bytes(self._fs_data)
-        self._fs_file_size = int.from_bytes(self._fs_data[0:4], byteorder='little')
-        nested_archive = {}
+        self._fs_data_list = []
+        fs_view = self._get_fs_view()
+        self._fs_file_size = int.from_bytes(fs_view[0:4], byteorder='little')
+        decoded_data_list = self._decode_all_in_parallel(workers, executor) if workers > 1 else None
+        compression_used_array = self._fi_data_list.compression_used_array
         for i in range(0, self._nb_file):
-            if i == self._nb_file - 1:
-                end_data = len(self._fs_data)
-            else:
-                end_data = self._fi_data_list[i + 1].packed_file_location
-            start_data = self._fi_data_list[i].packed_file_location + 4  # 4 bytes for length of file at start
+            start_data, end_data = self._get_entry_bounds(i, len(self._fs_data))
 
-            if self._fi_data_list[i].compression_used:
-                new_fs_data = self.lzs.decode(self._fs_data[start_data:end_data])
+            if compression_used_array[i]:
+                if decoded_data_list is not None:
+                    new_fs_data = decoded_data_list[i]
+                elif self._cache is not None:
+                    new_fs_data = self._decode_entry(i)
+                else:
+                    new_fs_data = self.lzs.decode(fs_view[start_data:end_data])
             else:
-                new_fs_data = self._fs_data[start_data:end_data]
+                new_fs_data = fs_view[start_data:end_data]
             self._fs_data_list.append(new_fs_data)
 
-            if nested:
-                extension = self._fl_data[i].split('.')[-1]
-                name = self._fl_data[i].split('\\')[-1].split('.')[0]
-                if extension in ("fs", "fi", "fl"):  # Means we have a nested archive
-                    if name not in nested_archive:
-                        nested_archive[name] = {}
-                    nested_archive[name][extension + "_data"] = new_fs_data
-                    nested_archive[name][extension + "_path"] = self._fl_data_list[i]
-                    print("New archive soon")
+    def _find_nested_triple_list(self) -> list[(str, int, int, int)]:
+        """Find the fs/fi/fl triples of the FL, giving the path without extension and the index of each file"""
+        triple_dict = {}  # Path without extension to extension to index
+        for i, path in enumerate(self._fl_data_list):
+            base_path, _, extension = path.rpartition('.')
+            if extension in ("fs", "fi", "fl"):
+                triple_dict.setdefault(base_path, {})[extension] = i
+        nested_triple_list = []
+        for base_path, index_dict in triple_dict.items():
+            if len(index_dict) != 3:
+                print(f"Archive missing some file for {base_path}")
+                continue
+            nested_triple_list.append((base_path, index_dict["fs"], index_dict["fi"], index_dict["fl"]))
+        return nested_triple_list
 
-        if nested:
-            for key, item in nested_archive.items():
-                if len(nested_archive[key]) != 6:
-                    print(f"Archive missing some file for {key}")
-                    continue
-                nested_fs = None
-                nested_fi = None
-                nested_fl = None
-                path_fs = None
-                path_fi = None
-                path_fl = None
-                for extension, data in item.items():
-                    if extension.split('_')[0] not in ("fs", "fi", "fl"):
-                        print(f"Unexpected extension: {extension}")
-                    elif extension == "fs_data":
-                        nested_fs = data
-                    elif extension == "fs_path":
-                        path_fs = data
-                    elif extension == "fi_data":
-                        nested_fi = data
-                    elif extension == "fi_path":
-                        path_fi = data
-                    elif extension == "fl_data":
-                        nested_fl = data
-                    elif extension == "fl_path":
-                        path_fl = data
-
-                new_archive = Archive(path_fs, path_fi, path_fl)
-                new_archive.load_data_from_bytes(nested_fs, nested_fi, nested_fl)
-                new_archive.analyse_data(nested=True)
-                self._archive_list.append(new_archive)
-
-    def get_fs_data_analysed(self) -> list[Generator[bytes, None, None]] | list[bytes] :
+    def _register_nested_archive(self):
+        """
+        Create a descriptor for each fs/fi/fl triple of the FL. Nothing is read here: a nested archive reads its data
+        from this archive only when needed.
+        """
+        for base_path, fs_index, fi_index, fl_index in self._nested_triple_list:
+            nested_archive = Archive(base_path + ".fs", base_path + ".fi", base_path + ".fl", verbose=False)
+            nested_archive.set_cache(self._cache)
+            nested_archive._nested = True
+            nested_archive._nested_source = (self, fs_index, fi_index, fl_index)
+            self._archive_list.append(nested_archive)
+
+    def _register_nested_archive_once(self):
+        """
+        Register the nested archives for a lookup if the archive was not analysed with nested.
+        Only the FI and FL are analysed for it, the FS is not read.
+        """
+        with self._lock:
+            if not self._fi_data_list:
+                self._nested = True
+                self._analyse_fi_fl()
+            elif not self._nested:
+                self._nested = True
+                self._register_nested_archive()
+                self._merged_path_index_dict = None
+                self._merged_name_index_dict = None
+
+    def _get_merged_index(self) -> (dict, dict):
+        """
+        Give the index of all the entries by path and by name, merged with the ones of the nested archives, so a search
+        doesn't need to go through each FL. Built at the first lookup: only the FI and FL of the nested archives are
+        read for it, not their FS.
+        :return: The path index and the name index
+        """
+        if self._merged_path_index_dict is None:
+            if not self._fi_data_list:
+                self._analyse_fi_fl()
+            self._merged_path_index_dict = {}
+            self._merged_name_index_dict = {}
+            for i, path in enumerate(self._fl_data_list):
+                self._merged_path_index_dict.setdefault(path.lower(), []).append((self, i))
+                self._merged_name_index_dict.setdefault(path.rsplit('\\', 1)[-1], []).append((self, i))
+            for archive in self._archive_list:
+                path_index_dict, name_index_dict = archive._get_merged_index()
+                for key, location_list in path_index_dict.items():
+                    self._merged_path_index_dict.setdefault(key, []).extend(location_list)
+                for key, location_list in name_index_dict.items():
+                    self._merged_name_index_dict.setdefault(key, []).extend(location_list)
+        return self._merged_path_index_dict, self._merged_name_index_dict
+
+    def _analyse_fi_fl(self):
+        """
+        Analyse the FL and the FI. They are read from their files if they were not loaded, the FS is not needed.
+        """
+        index_loaded = False
+        if not self._fi_data or not self._fl_data:
+            index_loaded = self._load_index_sidecar()
+            if not index_loaded:
+                self._load_fi_fl_data()
+        # For FL, the data is already a list of text
+        self._fl_data_list = self._fl_data
+        self._nb_file = len(self._fl_data_list)
+        self._fl_index_dict = {path.lower(): i for i, path in enumerate(self._fl_data_list)}
+        self._entry_lru.clear()
+        # FI analyse
+        self._fi_data_list = FiTable(self._fi_data)
+        if not index_loaded:
+            self._nested_triple_list = self._find_nested_triple_list()
+            if self._index_path and self._nested_source is None:
+                if self._get_index_source_stat() != self._read_index_header()[2:8]:
+                    self._write_index_sidecar()
+                elif self._entry_key_list is None:
+                    # The FI and FL were loaded from their files, but the cache keys of the sidecar are still valid
+                    self._load_index_sidecar()
+            else:
+                self._entry_key_list = None
+        self._merged_path_index_dict = None
+        self._merged_name_index_dict = None
+        self._archive_list = []
+        if self._nested:
+            self._register_nested_archive()
+
+    def _get_index_source_stat(self) -> tuple:
+        """Give the size and modification time of the FS, FI and FL, to know if the index sidecar is still valid"""
+        stat_list = []
+        for path in (self._fs_path, self._fi_path, self._fl_path):
+            stat = os.stat(path)
+            stat_list.extend((stat.st_size, stat.st_mtime_ns))
+        return tuple(stat_list)
+
+    def _read_index_header(self, index_data: bytes = None) -> tuple:
+        """Give the header of the index sidecar (read from its file if no data given), empty if not valid"""
+        if index_data is None:
+            try:
+                with open(self._index_path, "rb") as file:
+                    index_data = file.read(self.INDEX_HEADER.size)
+            except OSError:
+                return ()
+        if len(index_data) < self.INDEX_HEADER.size:
+            return ()
+        header = self.INDEX_HEADER.unpack_from(index_data)
+        if header[0] != self.INDEX_MAGIC or header[1] != self.INDEX_VERSION:
+            return ()
+        return header
+
+    def _load_index_sidecar(self) -> bool:
+        """
+        Read the FI, FL, nested archives and cache keys from the index sidecar, in a single read
+        :return: False if there is no valid sidecar (not used, missing, old version or the archive changed)
+        """
+        if not self._index_path or self._nested_source is not None:
+            return False
+        try:
+            with open(self._index_path, "rb") as file:
+                index_data = file.read()
+            source_stat = self._get_index_source_stat()
+        except OSError:
+            return False
+        header = self._read_index_header(index_data)
+        if header[2:8] != source_stat:
+            return False
+        nb_file, fi_size, fl_size, nb_nested = header[8:]
+        offset = self.INDEX_HEADER.size
+        self._fi_data = index_data[offset:offset + fi_size]
+        offset += fi_size
+        self._fl_data = index_data[offset:offset + fl_size].decode(encoding="utf8").splitlines()
+        offset += fl_size
+        self._nested_triple_list = []
+        for fs_index, fi_index, fl_index in struct.iter_unpack("<III", index_data[offset:offset + nb_nested * 12]):
+            self._nested_triple_list.append((self._fl_data[fs_index].rpartition('.')[0], fs_index, fi_index, fl_index))
+        offset += nb_nested * 12
+        digest_size = FsEntryCache.DIGEST_SIZE
+        self._entry_key_list = [index_data[offset + i * digest_size:offset + (i + 1) * digest_size].hex() for i in range(nb_file)]
+        return True
+
+    def _write_index_sidecar(self):
+        """Write the index sidecar from the FI/FL analysed, computing the cache key of each entry"""
+        fs_size = self._get_fs_size()
+        self._entry_key_list = []
+        for i, fi_data in enumerate(self._fi_data_list):
+            compressed_data = self._read_fs_slice(*self._get_entry_bounds(i, fs_size))
+            self._entry_key_list.append(FsEntryCache.compute_key(compressed_data, fi_data.length_unpack_file, fi_data.compression_used))
+        fl_data = "\n".join(self._fl_data_list).encode("utf8")
+        with open(self._index_path + ".tmp", "wb") as file:
+            file.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, self.INDEX_VERSION, *self._get_index_source_stat(),
+                                              self._nb_file, len(self._fi_data), len(fl_data), len(self._nested_triple_list)))
+            file.write(self._fi_data)
+            file.write(fl_data)
+            for _, fs_index, fi_index, fl_index in self._nested_triple_list:
+                file.write(struct.pack("<III", fs_index, fi_index, fl_index))
+            for key in self._entry_key_list:
+                file.write(bytes.fromhex(key))
+        os.replace(self._index_path + ".tmp", self._index_path)
+
+    def _get_entry_key(self, index: int, compressed_data: bytes) -> str:
+        """Give the cache key of an entry, from the index sidecar if there is one, else by hashing its data"""
+        if self._entry_key_list:
+            return self._entry_key_list[index]
+        return FsEntryCache.compute_key(compressed_data, self._fi_data_list[index].length_unpack_file, True)
+
+    def _decode_all_in_parallel(self, workers: int, executor: ProcessPoolExecutor = None) -> list[bytearray | None]:
+        """
+        Decompress all the compressed entries with a pool of processes.
+        The FS is not sent for each entry: the entries are sent by chunks, and each process maps the FS file for a chunk
+        if it was loaded with mmap, else the FS is copied once in a shared memory read by all the processes.
+        :param workers: The number of processes
+        :param executor: A pool of processes to use instead of creating one, which can be shared by several archives
+        :return: The decompressed data in the FL order (None for uncompressed entries)
+        """
+        decoded_data_list = [None] * self._nb_file
+        task_list = []
+        index_list = []
+        key_list = [None] * self._nb_file
+        fs_view = self._get_fs_view()
+        fi_table = self._fi_data_list
+        for i in range(self._nb_file):
+            if fi_table.compression_used_array[i]:
+                start_data, end_data = self._get_entry_bounds(i, len(self._fs_data))
+                if self._cache is not None:
+                    key_list[i] = self._get_entry_key(i, fs_view[start_data:end_data])
+                    decoded_data_list[i] = self._cache.get(key_list[i])
+                    if decoded_data_list[i] is not None:
+                        continue
+                task_list.append((start_data, end_data, fi_table.length_unpack_file_array[i]))
+                index_list.append(i)
+        if not task_list:
+            return decoded_data_list
+
+        fs_shared_memory = None
+        if isinstance(self._fs_data, mmap.mmap):
+            source_argument = (None, self._fs_path)
+        else:
+            fs_shared_memory = shared_memory.SharedMemory(create=True, size=len(self._fs_data))
+            fs_shared_memory.buf[:len(self._fs_data)] = self._fs_data
+            source_argument = (fs_shared_memory.name, None)
+        chunk_size = max(1, len(task_list) // (workers * 4))
+        task_list = [source_argument + (task_list[i:i + chunk_size],) for i in range(0, len(task_list), chunk_size)]
+        try:
+            if executor is None:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    self._collect_decoded_data(executor, task_list, index_list, key_list, decoded_data_list)
+            else:
+                self._collect_decoded_data(executor, task_list, index_list, key_list, decoded_data_list)
+        finally:
+            if fs_shared_memory is not None:
+                fs_shared_memory.close()
+                fs_shared_memory.unlink()
+        return decoded_data_list
+
+    def _collect_decoded_data(self, executor: ProcessPoolExecutor, task_list: list, index_list: list[int],
+                              key_list: list[str | None], decoded_data_list: list[bytearray | None]):
+        decoded_data_iterator = (decoded_data for decoded_chunk in executor.map(_decode_shared_entry_list, task_list)
+                                 for decoded_data in decoded_chunk)
+        for i, decoded_data in zip(index_list, decoded_data_iterator):
+            decoded_data_list[i] = decoded_data
+            if self._cache is not None:
+                self._cache.put(key_list[i], decoded_data)
+
+    def _decode_entry(self, index: int) -> bytearray | bytes:
+        """
+        Decompress at once a compressed entry, going through the cache if there is one
+        :param index: The index of the entry in the FL/FI
+        :return: The decompressed data
+        """
+        start_data, end_data = self._get_entry_bounds(index, self._get_fs_size())
+        compressed_data = self._read_fs_slice(start_data, end_data)
+        length_unpack_file = self._fi_data_list[index].length_unpack_file
+        if self._cache is None:
+            return self.lzs.decode_to_bytes(compressed_data, length_unpack_file)
+        key = self._get_entry_key(index, compressed_data)
+        decoded_data = self._cache.get(key)
+        if decoded_data is None:
+            decoded_data = self.lzs.decode_to_bytes(compressed_data, length_unpack_file)
+            self._cache.put(key, decoded_data)
+        return decoded_data
+
+    def _get_entry_bounds(self, index: int, fs_size: int) -> (int, int):
+        """
+        Give where the data of an entry is in the FS
+        :param index: The index of the entry in the FL/FI
+        :param fs_size: The size of the FS, as the last entry goes until the end of it
+        :return: The start and end offset of the data in the FS
+        """
+        fi_table = self._fi_data_list
+        start_data = fi_table.packed_file_location_array[index]
+        if not fi_table.compression_used_array[index]:
+            # FS/FI/FL format (FF8 modding wiki "FS, FI and FL" page, as read and written by Deling):
+            # an entry with FI compression 0 is stored as is at its FI location, its size being the FI unpacked
+            # length, and only the LZS entries (compression 1) start with the 4 bytes of their compressed size.
+            # Before, the reader skipped 4 bytes on every entry, which cut the start of the uncompressed ones.
+            return start_data, min(start_data + fi_table.length_unpack_file_array[index], fs_size)
+        if index == self._nb_file - 1:
+            end_data = fs_size
+        else:
+            end_data = fi_table.packed_file_location_array[index + 1]
+        start_data += self.OFFSET_SIZE  # 4 bytes for length of the compressed data at start
+        return start_data, end_data
+
+    def stream_entry(self, index: int, block_size=0x10000) -> Generator[bytes, None, None]:
+        """
+        Read an entry directly from the FS file by blocks, decompressing each block as soon as it is read.
+        The FS doesn't need to be loaded, and the memory used stays around the block size whatever the size of the entry.
+        :param index: The index of the entry in the FL/FI
+        :param block_size: The size of each block read from the FS file
+        :return: A generator giving the data of the entry block by block
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        start_data, end_data = self._get_entry_bounds(index, self._get_fs_size())
+        decoder = LzsDecoder() if self._fi_data_list[index].compression_used else None
+        for block in self._read_fs_by_block(start_data, end_data, block_size):
+            if decoder:
+                block = decoder.feed(block)
+            if block:
+                yield block
+        if decoder:
+            decoder.flush()
+
+    def _read_fs_by_block(self, start: int, end: int, block_size: int) -> Generator[bytes, None, None]:
+        """Give a part of the FS block by block, from the file, or from the parent archive for a nested archive"""
+        if self._nested_source is not None:
+            for offset in range(start, end, block_size):
+                yield self._read_fs_slice(offset, min(offset + block_size, end))
+            return
+        yield from _read_file_by_block(self._fs_path, start, end, block_size)
+
+    def _get_fs_view(self) -> memoryview:
+        """Give a read-only view over the FS data, created again only if the data changed"""
+        if self._fs_view is None or self._fs_view.obj is not self._fs_data:
+            self._fs_view = memoryview(self._fs_data).toreadonly()
+        return self._fs_view
+
+    def _get_fs_size(self) -> int:
+        if not self._fs_data and self._nested_source is not None:
+            self._load_fs_data()
+        return len(self._fs_data) if self._fs_data else os.path.getsize(self._fs_path)
+
+    def _read_fs_slice(self, start: int, end: int) -> bytes:
+        """
+        Give a part of the FS, from memory if loaded, else directly from the file.
+        A nested archive has no file, so its FS is read from the parent archive at the first use.
+        """
+        if not self._fs_data and self._nested_source is not None:
+            self._load_fs_data()
+        if self._fs_data:
+            return self._get_fs_view()[start:end]
+        with open(self._fs_path, "rb") as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    def peek_entry(self, index: int, n_bytes: int) -> bytes:
+        """
+        Give the start of an entry, decompressing only what is needed (for example to read a header or a magic).
+        The FS doesn't need to be loaded, and only the start of the compressed data is read if it is not.
+        :param index: The index of the entry in the FL/FI
+        :param n_bytes: The number of bytes wanted
+        :return: The n_bytes first bytes of the entry (less if the entry is smaller)
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        start_data, end_data = self._get_entry_bounds(index, self._get_fs_size())
+        if self._fi_data_list[index].compression_used:
+            # At worst, each byte is a literal byte (1 byte + 1 flag bit)
+            end_data = min(end_data, start_data + n_bytes + n_bytes // 8 + 2)
+            return bytes(self.lzs.decode_to_bytes(self._read_fs_slice(start_data, end_data), n_bytes, max_output=n_bytes))
+        return bytes(self._read_fs_slice(start_data, min(end_data, start_data + n_bytes)))
+
+    def set_entry_lru_size(self, size: int):
+        """
+        Keep the last entries given by get_entry in memory, so asking them again doesn't decompress them again
+        :param size: The number of entries kept, 0 to keep none
+        """
+        self._entry_lru_size = size
+        while len(self._entry_lru) > size:
+            self._entry_lru.popitem(last=False)
+
+    def get_entry_index(self, path: str) -> int | None:
+        """
+        Give the index of an entry from its FL path (case-insensitive, as the paths are Windows paths)
+        :param path: The full path as in the FL, for example c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\chara.one
+        :return: The index, None if not found
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        return self._fl_index_dict.get(path.lower())
+
+    def get_entry(self, entry: int | str) -> bytearray | bytes | memoryview | None:
+        """
+        Give the data of one entry, decompressing only this one.
+        There is no need to analyse the archive: the FI and FL are analysed at the first call, and the FS is read
+        from memory if loaded, else from the file.
+        :param entry: The index of the entry in the FL/FI, or its path in the FL
+        :return: The decompressed data (a read-only memoryview if uncompressed and loaded), None if not found
+        """
+        self._analyse_fi_fl_once()
+        index = self.get_entry_index(entry) if isinstance(entry, str) else entry
+        if index is None or not 0 <= index < self._nb_file:
+            print(f"Entry not found in the archive {self.name}: {entry}")
+            return None
+        if index in self._replaced_entry_dict:
+            return self._replaced_entry_dict[index]
+        with self._lock:
+            if index in self._entry_lru:
+                self._entry_lru.move_to_end(index)
+                return self._entry_lru[index]
+        if self._fi_data_list[index].compression_used:
+            entry_data = self._decode_entry(index)
+        else:
+            entry_data = self._read_fs_slice(*self._get_entry_bounds(index, self._get_fs_size()))
+        if self._entry_lru_size > 0:
+            with self._lock:
+                self._entry_lru[index] = entry_data
+                if len(self._entry_lru) > self._entry_lru_size:
+                    self._entry_lru.popitem(last=False)
+        return entry_data
+
+    def _analyse_fi_fl_once(self):
+        """Analyse the FI and FL if not done yet, only once even if called by several threads at the same time"""
+        with self._lock:
+            if not self._fi_data_list:
+                self._analyse_fi_fl()
+
+    async def aload(self, use_mmap=False, executor=None):
+        """
+        Same as load_data, done in an executor so the event loop is not blocked
+        :param use_mmap: If True, the FS is memory mapped instead of read
+        :param executor: The executor to use, the default one of the loop if None
+        """
+        await asyncio.get_running_loop().run_in_executor(executor, lambda: self.load_data(use_mmap=use_mmap))
+
+    async def aanalyse(self, nested=False, executor=None):
+        """
+        Same as analyse_data, done in an executor so the event loop is not blocked
+        :param nested: If True, the sub archives are registered
+        :param executor: The executor to use, the default one of the loop if None
+        """
+        await asyncio.get_running_loop().run_in_executor(executor, lambda: self.analyse_data(nested=nested))
+
+    async def aget_entry(self, entry: int | str, executor=None) -> bytearray | bytes | memoryview | None:
+        """
+        Same as get_entry, the reading and decompression being done in an executor so the event loop is not blocked
+        :param entry: The index of the entry in the FL/FI, or its path in the FL
+        :param executor: The executor to use, the default one of the loop if None
+        :return: The decompressed data, None if not found
+        """
+        return await asyncio.get_running_loop().run_in_executor(executor, self.get_entry, entry)
+
+    async def aiter_entries(self, prefetch=4, executor=None) -> AsyncGenerator[tuple[str, bytearray | bytes | memoryview], None]:
+        """
+        Give all the entries in the FL order, each one read and decompressed in an executor.
+        The next entries are prepared while the current one is used, and several requests can iterate over the same
+        archive at the same time.
+        The executor needs to be a thread executor, as the entries are read by this archive.
+        :param prefetch: The number of entries prepared in advance
+        :param executor: The executor to use, the default one of the loop if None
+        :return: An async generator giving (FL path, data) for each entry
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, self._analyse_fi_fl_once)
+        pending_deque = deque()
+        for i, path in enumerate(self._fl_data_list):
+            pending_deque.append((path, loop.run_in_executor(executor, self.get_entry, i)))
+            if len(pending_deque) >= max(1, prefetch):
+                path, future = pending_deque.popleft()
+                yield path, await future
+        while pending_deque:
+            path, future = pending_deque.popleft()
+            yield path, await future
+
+    def get_fs_data_analysed(self) -> list[Generator[bytes, None, None] | bytearray | memoryview]:
         """
         Give the previously analysed data (empty if no analysed have been done), which can contains generator
-        if there is compressed data AND the generator hasn't been used
+        if there is compressed data AND the generator hasn't been used.
+        The uncompressed data are read-only memoryview over the FS, use bytes() to get a copy
+        A nested archive is analysed at the first call.
         :return: The FS data
         """
+        if self._nested_source is not None and not self._fs_data_list:
+            self.analyse_data(nested=True)
         return self._fs_data_list
 
-    def get_fi_data_analysed(self) -> list[FiSingleData]:
+    def get_fi_data_analysed(self) -> FiTable:
+        """
+        Give the analysed FI, a FiTable giving a FiSingleData for each entry
+        """
+        if self._nested_source is not None and not self._fi_data_list:
+            self._analyse_fi_fl()
         return self._fi_data_list
 
     def get_fl_data_analysed(self) -> list[str]:
+        if self._nested_source is not None and not self._fi_data_list:
+            self._analyse_fi_fl()
         return self._fl_data_list
 
     def get_archive_list(self) -> list[type['Archive']]:
@@ -227,19 +861,236 @@ class Archive:
         :param name: The name of the element searched
         :return: The list of all element found with this name. Each element of the list is a tuple of (fl string, fs data)
         """
-        list_return = []
         if not self.is_analysed():
             print("get_all_data_by_name:Archive not analysed")
             return []
-        fs_data = self.get_fs_data_analysed()
-        fl_data = self.get_fl_data_analysed()
-        archive_list = self.get_archive_list()
-        for i, path_fl in enumerate(fl_data):
-            if path_fl.split('\\')[-1] == name:
-                list_return.append((path_fl, fs_data[i]))
-        for archive in archive_list:
-            list_return.extend(archive.get_all_data_by_name(name=name))
-        return list_return
+        return [(archive.get_fl_data_analysed()[i], archive.get_fs_data_analysed()[i])
+                for archive, i in self._get_merged_index()[1].get(name, [])]
+
+    def get_all_entry_location_by_name(self, name, nested=False) -> list[(type['Archive'], int)]:
+        """
+        Give where all the entries with a specific name are, in this archive or in the nested ones
+        :param name: The name of the element searched (the last element of the path in the fl file)
+        :param nested: If True, the nested archives are searched even if the archive was not analysed with nested
+        (only the FI and FL are needed for it). Else they are searched only if analysed with nested.
+        :return: The list of (archive, index in the archive)
+        """
+        if nested:
+            self._register_nested_archive_once()
+        return list(self._get_merged_index()[1].get(name, []))
+
+    def get_data_by_path(self, path: str, nested=False) -> bytearray | bytes | memoryview | None:
+        """
+        Give the data of the entry with this full path, in this archive or in the nested ones.
+        Only this entry is decompressed, with get_entry.
+        :param path: The full path as in the FL (case-insensitive)
+        :param nested: If True, the nested archives are searched even if the archive was not analysed with nested
+        (only the FI and FL are needed for it). Else they are searched only if analysed with nested.
+        :return: The data, None if not found
+        """
+        if nested:
+            self._register_nested_archive_once()
+        location_list = self._get_merged_index()[0].get(path.lower())
+        if not location_list:
+            return None
+        archive, index = location_list[0]
+        return archive.get_entry(index)
+
+    @staticmethod
+    def get_extract_path(dest_folder_path: str, fl_path: str) -> str:
+        """
+        Give where an entry is extracted: its FL path without the drive, in the destination folder.
+        For example c:\\ff8\\data\\eng\\main\\init.out gives dest_folder_path/ff8/data/eng/main/init.out
+        """
+        part_list = [part for part in fl_path.split('\\') if part not in ("", ".", "..")]
+        if part_list and part_list[0].endswith(':'):
+            part_list = part_list[1:]
+        return os.path.join(dest_folder_path, *part_list)
+
+    def extract_all(self, dest_folder_path: str, recursive=True, workers=1, block_size=0x10000) -> list[str]:
+        """
+        Write all the entries on the disk, recreating the folders of the FL paths (see get_extract_path).
+        Each entry is streamed to its file block by block, so the memory used doesn't depend on the size of the archive.
+        Only a nested archive is in memory while its entries are extracted, as it is itself an entry.
+        :param dest_folder_path: The folder where the entries are written
+        :param recursive: If True, the entries of the nested archives are also extracted (next to the fs/fi/fl files)
+        :param workers: If more than 1, the entries are extracted by this number of processes, each one reading the
+        FS file (the entries of the nested archives are always extracted by this process)
+        :param block_size: The size of each block read from the FS
+        :return: The path of all the files written
+        """
+        if not self._fi_data_list or (recursive and not self._nested):
+            self._nested = self._nested or recursive
+            self._analyse_fi_fl()
+        dest_path_list = [Archive.get_extract_path(dest_folder_path, path) for path in self._fl_data_list]
+        task_list = []
+        fs_size = self._get_fs_size()
+        for i, dest_path in enumerate(dest_path_list):
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            if workers > 1 and self._nested_source is None:
+                start_data, end_data = self._get_entry_bounds(i, fs_size)
+                task_list.append((self._fs_path, start_data, end_data, self._fi_data_list[i].compression_used, dest_path, block_size))
+            else:
+                with open(dest_path, "wb") as file:
+                    for block in self.stream_entry(i, block_size):
+                        file.write(block)
+        if task_list:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for _ in executor.map(_extract_file_entry, task_list, chunksize=max(1, len(task_list) // (workers * 4))):
+                    pass
+        if recursive:
+            for archive in self._archive_list:
+                dest_path_list.extend(archive.extract_all(dest_folder_path, recursive=True, block_size=block_size))
+                archive.unload_data()
+        return dest_path_list
+
+    def replace_entry(self, entry: int | str, data: bytes):
+        """
+        Replace the data of an entry. The files are not modified: the new data is given by get_entry and written by
+        repack (or write).
+        :param entry: The index of the entry in the FL/FI, or its path in the FL
+        :param data: The new decompressed data
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        index = self.get_entry_index(entry) if isinstance(entry, str) else entry
+        if index is None or not 0 <= index < self._nb_file:
+            print(f"Entry not found in the archive {self.name}: {entry}")
+            return
+        self._entry_lru.pop(index, None)
+        self._replaced_entry_dict[index] = data
+
+    def get_replaced_entry_index_list(self) -> list[int]:
+        return sorted(self._replaced_entry_dict)
+
+    def repack(self, fs_path=None, fi_path=None, fl_path=None, compression=True, level="default", parsing="greedy", workers=1) -> list[FiSingleData]:
+        """
+        Write the archive with the entries replaced by replace_entry. Only these entries are compressed: the compressed
+        data of the others is copied as is from the FS, with only their location in the FI changed.
+        When written over the files of this archive, the archive then reads the new files.
+        :param fs_path: The path of the FS file written, the one of this archive if None
+        :param fi_path: The path of the FI file written, the one of this archive if None
+        :param fl_path: The path of the FL file written, the one of this archive if None
+        :param compression: If True, the replaced entries are compressed with LZS
+        :param level: The level of Lzs.encode
+        :param parsing: The parsing of Lzs.encode
+        :param workers: If more than 1, the replaced entries are compressed by this number of processes
+        :return: The FI of the written archive
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        fs_path = fs_path or self._fs_path
+        fi_path = fi_path or self._fi_path
+        fl_path = fl_path or self._fl_path
+
+        def read_entries():
+            fs_size = self._get_fs_size()
+            for i, path in enumerate(self._fl_data_list):
+                if i in self._replaced_entry_dict:
+                    yield path, self._replaced_entry_dict[i]
+                else:
+                    fi_data = self._fi_data_list[i]
+                    yield path, PackedEntry(fi_data.length_unpack_file, self._read_fs_slice(*self._get_entry_bounds(i, fs_size)),
+                                            fi_data.compression_used)
+
+        fi_data_list = Archive.write_entry_list(fs_path, fi_path, fl_path, read_entries(), compression=compression,
+                                                level=level, parsing=parsing, workers=workers)
+        if (fs_path, fi_path, fl_path) == (self._fs_path, self._fi_path, self._fl_path):
+            self._replaced_entry_dict = {}
+            self.unload_data()
+            self._fi_data_list = FiTable()
+            self._fs_data_list = []
+        return fi_data_list
+
+    def write(self, fs_path: str, fi_path: str, fl_path: str, compression=True, level="default", parsing="greedy", workers=1) -> list[FiSingleData]:
+        """
+        Write all the entries of this archive in new FS, FI and FL files (the paths can be the ones of this archive).
+        The entries are read one by one with get_entry, the FS doesn't need to be loaded.
+        :param fs_path: The path of the FS file written
+        :param fi_path: The path of the FI file written
+        :param fl_path: The path of the FL file written
+        :param compression: If True, the entries are compressed with LZS
+        :param level: The level of Lzs.encode
+        :param parsing: The parsing of Lzs.encode
+        :param workers: If more than 1, the entries are compressed by this number of processes
+        :return: The FI of the written archive
+        """
+        if not self._fi_data_list:
+            self._analyse_fi_fl()
+        entry_generator = ((path, self.get_entry(i)) for i, path in enumerate(self._fl_data_list))
+        return Archive.write_entry_list(fs_path, fi_path, fl_path, entry_generator, compression=compression, level=level,
+                                        parsing=parsing, workers=workers)
+
+    @staticmethod
+    def write_entry_list(fs_path: str, fi_path: str, fl_path: str, entry_iterable, compression=True, level="default",
+                         parsing="greedy", workers=1) -> list[FiSingleData]:
+        """
+        Write an archive from its entries, computing the location of each entry in the FI.
+        Each file is first written under a temporary name then renamed, so an archive can be written over the files
+        it reads its entries from.
+        :param fs_path: The path of the FS file written
+        :param fi_path: The path of the FI file written
+        :param fl_path: The path of the FL file written
+        :param entry_iterable: The (FL path, data) of each entry, in the FL order. The data is the decompressed data,
+        or a PackedEntry to write it as is. With a generator, only a few entries are in memory at once
+        :param compression: If True, the entries (except the PackedEntry) are compressed with LZS
+        :param level: The level of Lzs.encode
+        :param parsing: The parsing of Lzs.encode
+        :param workers: If more than 1, the entries are compressed by this number of processes. As processes are used,
+        the calling script needs the if __name__ == "__main__" guard on Windows.
+        :return: The FI of the written archive
+        """
+        fl_path_list = []
+        fi_data_list = []
+        with open(fs_path + ".tmp", "wb") as file:
+            for path, packed_entry in Archive._pack_entries(entry_iterable, compression, level, parsing, workers):
+                packed_data = packed_entry.packed_data
+                fi_data_list.append(FiSingleData(packed_entry.length_unpack_file, file.tell(), packed_entry.compression_used))
+                if packed_entry.compression_used:  # Only the LZS entries start with their size (see Archive._get_entry_bounds)
+                    file.write(len(packed_data).to_bytes(Archive.OFFSET_SIZE, byteorder="little"))
+                file.write(packed_data)
+                fl_path_list.append(path)
+        with open(fi_path + ".tmp", "wb") as file:
+            for fi_data in fi_data_list:
+                file.write(struct.pack("<III", fi_data.length_unpack_file, fi_data.packed_file_location, fi_data.compression_used))
+        with open(fl_path + ".tmp", "w", encoding="utf8", newline="") as file:
+            file.write("".join(path + "\r\n" for path in fl_path_list))
+        for path in (fs_path, fi_path, fl_path):
+            os.replace(path + ".tmp", path)
+        return fi_data_list
+
+    @staticmethod
+    def _pack_entries(entry_iterable, compression: bool, level: str, parsing: str, workers: int) -> Generator[tuple[str, PackedEntry], None, None]:
+        """
+        Give the (FL path, PackedEntry) of each entry, in the same order.
+        With several workers, only a few entries are sent in advance to the processes, to bound the memory used.
+        """
+        if not compression or workers <= 1:
+            for path, data in entry_iterable:
+                if isinstance(data, PackedEntry):
+                    yield path, data
+                elif compression:
+                    yield path, PackedEntry(len(data), Lzs().encode(data, level=level, parsing=parsing), True)
+                else:
+                    yield path, PackedEntry(len(data), data, False)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending_deque = deque()  # (path, unpacked size, future) or (path, PackedEntry, None)
+            for path, data in entry_iterable:
+                if isinstance(data, PackedEntry):
+                    pending_deque.append((path, data, None))
+                else:
+                    pending_deque.append((path, len(data), executor.submit(_encode_entry, (bytes(data), level, parsing))))
+                if len(pending_deque) >= workers * 4:
+                    yield Archive._get_packed_entry(*pending_deque.popleft())
+            while pending_deque:
+                yield Archive._get_packed_entry(*pending_deque.popleft())
+
+    @staticmethod
+    def _get_packed_entry(path: str, packed_entry_or_size: PackedEntry | int, future: Future | None) -> (str, PackedEntry):
+        if future is None:
+            return path, packed_entry_or_size
+        return path, PackedEntry(packed_entry_or_size, future.result(), True)
 
 
 class FsManager:
@@ -251,6 +1102,9 @@ class FsManager:
 
     def __init__(self, folder_path=None):
         self._archive_list = []
+        self._archive_dict = {}  # Name to archive
+        self._cache = None
+        self._use_index_sidecar = False
         if folder_path:
             self.preload_all_archive_in_folder(folder_path)
 
@@ -269,7 +1123,7 @@ class FsManager:
         :param folder_path: The path to the folder containing the 3 files fs, fl and fi. The name of the 3 files need to be the same
         """
         for file_name in Archive.FILE_NAME_STR_LIST:
-            self._archive_list.append(Archive.from_folder_and_name(folder_path, file_name))
+            self._add_archive(Archive.from_folder_and_name(folder_path, file_name))
 
     def preload_all_archive_in_folder(self, folder_path: str):
         """
@@ -281,26 +1135,80 @@ class FsManager:
             if os.path.exists(fs_file.replace(".fs", ".fi")):
                 if os.path.exists(fs_file.replace(".fs", ".fl")):
                     file_name = pathlib.Path(fs_file).name.replace(".fs", "")
-                    self._archive_list.append(Archive.from_folder_and_name(folder_path, file_name))
+                    self._add_archive(Archive.from_folder_and_name(folder_path, file_name))
                 else:
                     print(f"File {fs_file.replace(".fs", ".fl")} doesn't exist")
             else:
                 print(f"File {fs_file.replace(".fs", ".fi")} doesn't exist")
 
-    def load_all_archive(self):
+    def load_all_archive(self, use_mmap=False, workers=1) -> dict[str, float]:
         """
         Load in memory the archive.
+        :param use_mmap: If True, the FS files are memory mapped instead of read
+        :param workers: If more than 1, the archives are loaded at the same time by this number of threads, as loading
+        is mostly waiting for the disk
+        :return: The time in seconds to load each archive, by name
         """
+        def load_archive(archive: Archive) -> float:
+            start_time = time.perf_counter()
+            archive.load_data(use_mmap=use_mmap)
+            return time.perf_counter() - start_time
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                time_list = list(executor.map(load_archive, self._archive_list))
+        else:
+            time_list = [load_archive(archive) for archive in self._archive_list]
+        return {archive.name: load_time for archive, load_time in zip(self._archive_list, time_list)}
+
+    def _add_archive(self, archive: Archive):
+        archive.set_cache(self._cache)
+        archive.set_index_path(archive.get_default_index_path() if self._use_index_sidecar else None)
+        self._archive_list.append(archive)
+        self._archive_dict.setdefault(archive.name, archive)
+
+    def set_cache(self, cache: FsEntryCache | None):
+        """
+        Use a cache on disk for the decompressed entries of all the archives (also the ones preloaded later)
+        :param cache: The cache to use, None to stop using one
+        """
+        self._cache = cache
         for archive in self._archive_list:
-            archive.load_data()
+            archive.set_cache(cache)
 
-    def analyse_all_archive(self, nested=False):
+    def set_index_sidecar(self, use_index_sidecar: bool):
         """
-        Analyse all archive
-        :param nested: If True, the sub archive will be analysed
+        Use an index sidecar next to each archive (also the ones preloaded later), see Archive.set_index_path
+        :param use_index_sidecar: True to use them
         """
+        self._use_index_sidecar = use_index_sidecar
         for archive in self._archive_list:
-            archive.analyse_data(nested)
+            archive.set_index_path(archive.get_default_index_path() if use_index_sidecar else None)
+
+    def analyse_all_archive(self, nested=False, workers=1) -> dict[str, float]:
+        """
+        Analyse all archive
+        :param nested: If True, the sub archives are registered, and analysed only when a lookup reaches them
+        :param workers: If more than 1, the compressed data of all the archives is decompressed in advance by one pool
+        of this number of processes. The archives are analysed at the same time, so the processes stay busy until the
+        last entry of the last archive, instead of waiting for the end of each archive.
+        :return: The time in seconds to analyse each archive, by name
+        """
+        def analyse_archive(archive: Archive, executor: ProcessPoolExecutor = None) -> float:
+            start_time = time.perf_counter()
+            archive.analyse_data(nested, workers=workers, executor=executor)
+            return time.perf_counter() - start_time
+
+        if workers > 1 and self._archive_list:
+            with ProcessPoolExecutor(max_workers=workers) as process_executor:
+                # The processes are created now, as creating them from the threads of the archives could deadlock
+                for future in [process_executor.submit(int) for _ in range(workers)]:
+                    future.result()
+                with ThreadPoolExecutor(max_workers=len(self._archive_list)) as thread_executor:
+                    time_list = list(thread_executor.map(lambda archive: analyse_archive(archive, process_executor), self._archive_list))
+        else:
+            time_list = [analyse_archive(archive) for archive in self._archive_list]
+        return {archive.name: analyse_time for archive, analyse_time in zip(self._archive_list, time_list)}
 
     def unload_all_archive(self):
         """
@@ -309,16 +1217,61 @@ class FsManager:
         for archive in self._archive_list:
             archive.unload_data()
 
-    def load_archive_by_name(self, name: str):
-        self.get_archive_by_name(name).load_data()
+    def load_archive_by_name(self, name: str, use_mmap=False):
+        self.get_archive_by_name(name).load_data(use_mmap=use_mmap)
 
-    def analyse_archive_by_name(self, name, nested=False):
+    def analyse_archive_by_name(self, name, nested=False, workers=1):
         """
         Analyse the archive by name
         :param name: The name of the archive (the common name of the 3 files fs, fi and fl)
-        :param nested: If True, the sub archive will be analysed
+        :param nested: If True, the sub archives are registered, and analysed only when a lookup reaches them
+        :param workers: If more than 1, the compressed data is decompressed in advance by this number of processes
+        """
+        self.get_archive_by_name(name).analyse_data(nested, workers=workers)
+
+    def pack_folder(self, folder_path: str, dest_folder_path: str, name: str, path_prefix="c:\\", compression=True,
+                    level="default", parsing="greedy", workers=1) -> Archive:
+        """
+        Create an archive from all the files of a folder and its sub folders, without external tool.
+        The FL path of each file is its path relative to the folder, with Windows separators, after the prefix.
+        For example the file ff8/data/eng/main/init.out gives c:\\ff8\\data\\eng\\main\\init.out
+        :param folder_path: The folder with the files to pack
+        :param dest_folder_path: The folder where the FS, FI and FL are written
+        :param name: The name of the archive (the common name of the 3 files fs, fi and fl)
+        :param path_prefix: The start of each FL path
+        :param compression: If True, the entries are compressed with LZS
+        :param level: The level of Lzs.encode
+        :param parsing: The parsing of Lzs.encode
+        :param workers: If more than 1, the entries are compressed by this number of processes
+        :return: The archive written
+        """
+        file_path_list = sorted(str(path) for path in pathlib.Path(folder_path).rglob("*") if path.is_file())
+
+        def read_entries():
+            for file_path in file_path_list:
+                with open(file_path, "rb") as file:
+                    data = file.read()
+                yield path_prefix + os.path.relpath(file_path, folder_path).replace(os.sep, "\\"), data
+
+        os.makedirs(dest_folder_path, exist_ok=True)
+        archive = Archive.from_folder_and_name(dest_folder_path, name)
+        Archive.write_entry_list(archive._fs_path, archive._fi_path, archive._fl_path, read_entries(),
+                                 compression=compression, level=level, parsing=parsing, workers=workers)
+        return archive
+
+    def extract_all(self, dest_folder_path: str, recursive=True, workers=1) -> list[str]:
+        """
+        Write the entries of all the archives on the disk, in the folders of their FL paths, without external tool.
+        Each entry is streamed to its file, so the memory used stays around the size of the biggest entry.
+        :param dest_folder_path: The folder where the entries are written
+        :param recursive: If True, the entries of the nested archives are also extracted
+        :param workers: If more than 1, the entries are extracted by this number of processes
+        :return: The path of all the files written
         """
-        self.get_archive_by_name(name).analyse_data(nested)
+        dest_path_list = []
+        for archive in self._archive_list:
+            dest_path_list.extend(archive.extract_all(dest_folder_path, recursive=recursive, workers=workers))
+        return dest_path_list
 
     def get_data_by_name(self, name: str):
         self.get_archive_by_name(name).get_fs_data_analysed()
@@ -329,9 +1282,8 @@ class FsManager:
         :param name: The name of the archive (the common name of the 3 files fs, fi and fl)
         :return: The archive (None if no archive found)
         """
-        for archive in self._archive_list:
-            if archive.name == name:
-                return archive
+        if name in self._archive_dict:
+            return self._archive_dict[name]
         print(f"Name not found in the archive: {name}")
 
     def get_all_data_by_name(self, name) -> list[(str, Generator[bytes, None, None])]:
@@ -345,6 +1297,19 @@ class FsManager:
             list_return.extend(archive.get_all_data_by_name(name))
         return list_return
 
+    def get_data_by_path(self, path: str, nested=False) -> bytearray | bytes | memoryview | None:
+        """
+        Give the data of the entry with this full path, searched in all archives and their nested ones
+        :param path: The full path as in the FL (case-insensitive)
+        :param nested: If True, the nested archives are searched even if not analysed with nested (see Archive.get_data_by_path)
+        :return: The data, None if not found
+        """
+        for archive in self._archive_list:
+            data = archive.get_data_by_path(path, nested=nested)
+            if data is not None:
+                return data
+        return None
+
 
 if __name__ == "__main__":
     # First an example for reading one file in the fs
@@ -0,0 +1,412 @@
+import asyncio
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from fs.fscache import FsEntryCache
+from fs.fsmanager import Archive, FiSingleData, FiTable, FsManager
+from fs.lzs import Lzs
+
+
+def build_archive_data(entry_list: list[(str, bytes)], compression=True) -> (bytes, bytes, bytes):
+    """Give the fs, fi and fl data of an archive"""
+    fs_data = bytearray()
+    fi_data = bytearray()
+    for path, data in entry_list:
+        compressed = Lzs().encode(data) if compression else data
+        fi_data.extend(len(data).to_bytes(4, byteorder="little"))
+        fi_data.extend(len(fs_data).to_bytes(4, byteorder="little"))
+        fi_data.extend(int(compression).to_bytes(4, byteorder="little"))
+        if compression:
+            fs_data.extend(len(compressed).to_bytes(4, byteorder="little"))
+        fs_data.extend(compressed)
+    return bytes(fs_data), bytes(fi_data), "\n".join(path for path, _ in entry_list).encode("utf8")
+
+
+def create_archive_files(folder_path: str, name: str, entry_list: list[(str, bytes)], compression=True):
+    """Write a fs/fi/fl triple"""
+    for extension, data in zip(("fs", "fi", "fl"), build_archive_data(entry_list, compression)):
+        with open(os.path.join(folder_path, name + "." + extension), "wb") as file:
+            file.write(data)
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        rng = random.Random(0)
+        self.entry_list = [
+            ("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\bcgate1.msd", b"Welcome to Balamb Garden " * 50),
+            ("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\chara.one", rng.randbytes(3000) + bytes(5000)),
+            ("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate2\\chara.one", bytes(rng.choice(b"\x00\x01\x10") for _ in range(70000))),
+            ("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate2\\empty.inf", b""),
+        ]
+        create_archive_files(self.temp_dir.name, "field", self.entry_list)
+        self.archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_analyse(self):
+        self.archive.load_data()
+        self.archive.analyse_data()
+        self.assertEqual(self.archive.get_fl_data_analysed(), [path for path, _ in self.entry_list])
+        fs_data = self.archive.get_fs_data_analysed()
+        for i, (path, data) in enumerate(self.entry_list):
+            self.assertEqual(bytes(fs_data[i]), data)
+            self.assertEqual(self.archive.get_fi_data_analysed()[i].length_unpack_file, len(data))
+
+    def test_fi_table(self):
+        fi_table = FiTable(bytes.fromhex("10000000 00000000 01000000 ffffffff 14000000 00000000"))
+        self.assertEqual(len(fi_table), 2)
+        self.assertEqual(fi_table[1], FiSingleData(0xFFFFFFFF, 0x14, False))
+        self.assertEqual(fi_table, [FiSingleData(0x10, 0, True), FiSingleData(0xFFFFFFFF, 0x14, False)])
+        self.assertEqual(fi_table[1:], [FiSingleData(0xFFFFFFFF, 0x14, False)])
+        self.assertEqual(fi_table[::-1], list(fi_table)[::-1])
+        self.assertFalse(FiTable())
+
+    def test_analyse_uncompressed_view(self):
+        create_archive_files(self.temp_dir.name, "raw", self.entry_list, compression=False)
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "raw")
+        archive.analyse_data()
+        fs_data = archive.get_fs_data_analysed()
+        for i, (path, data) in enumerate(self.entry_list):
+            self.assertIsInstance(fs_data[i], memoryview)
+            self.assertTrue(fs_data[i].readonly)
+            self.assertEqual(fs_data[i], data)
+        archive.unload_data()
+        archive.load_data()
+        archive.analyse_data()
+        self.assertEqual(archive.get_fs_data_analysed()[0], self.entry_list[0][1])
+
+    def test_analyse_workers(self):
+        self.archive.analyse_data(workers=2)
+        fs_data = self.archive.get_fs_data_analysed()
+        for i, (path, data) in enumerate(self.entry_list):
+            self.assertEqual(fs_data[i], data)
+
+    def test_analyse_workers_resource_tracker(self):
+        # Run in a new process, as the resource tracker reports in its own process, at the end of the main one
+        script = ("import sys\n"
+                  "from fs.fsmanager import Archive, FsManager\n"
+                  "if __name__ == '__main__':\n"
+                  "    Archive.from_folder_and_name(sys.argv[1], 'field').analyse_data(workers=2)\n"
+                  "    FsManager(sys.argv[1]).analyse_all_archive(workers=2)\n")
+        result = subprocess.run([sys.executable, "-c", script, self.temp_dir.name], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn("resource_tracker", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
+    def test_analyse_mmap(self):
+        for workers in (1, 2):
+            self.archive.load_data(use_mmap=True)
+            self.archive.analyse_data(workers=workers)
+            for i, (path, data) in enumerate(self.entry_list):
+                self.assertEqual(bytes(self.archive.get_fs_data_analysed()[i]), data)
+            self.assertEqual(self.archive.peek_entry(1, 10), self.entry_list[1][1][:10])
+            self.archive.unload_data()
+
+    def test_get_entry(self):
+        for i, (path, data) in enumerate(self.entry_list):
+            self.assertEqual(self.archive.get_entry(i), data)
+            self.assertEqual(self.archive.get_entry(path), data)
+            self.assertEqual(self.archive.get_entry(path.upper()), data)
+        self.assertIsNone(self.archive.get_entry("c:\\ff8\\unknown"))
+        self.assertIsNone(self.archive.get_entry(len(self.entry_list)))
+        self.archive.set_entry_lru_size(2)
+        first_data = self.archive.get_entry(0)
+        self.assertIs(self.archive.get_entry(0), first_data)
+        self.archive.get_entry(1)
+        self.archive.get_entry(2)
+        self.assertIsNot(self.archive.get_entry(0), first_data)
+        self.archive.load_data()
+        self.assertEqual(self.archive.get_entry(2), self.entry_list[2][1])
+
+    def test_async(self):
+        async def read_all():
+            return [(path, bytes(data)) async for path, data in self.archive.aiter_entries(prefetch=2)]
+
+        async def run():
+            await self.archive.aload()
+            await self.archive.aanalyse()
+            self.archive.set_entry_lru_size(2)
+            entry_list_list = await asyncio.gather(read_all(), read_all(), read_all())
+            return entry_list_list, await self.archive.aget_entry(self.entry_list[2][0])
+
+        entry_list_list, entry_data = asyncio.run(run())
+        for entry_list in entry_list_list:
+            self.assertEqual(entry_list, self.entry_list)
+        self.assertEqual(entry_data, self.entry_list[2][1])
+
+    def test_cache(self):
+        cache_path = os.path.join(self.temp_dir.name, "cache")
+        cache = FsEntryCache(cache_path)
+        self.archive.set_cache(cache)
+        self.archive.analyse_data()
+        self.assertEqual(cache.nb_miss, len(self.entry_list))
+        for workers in (1, 2):
+            cache = FsEntryCache(cache_path)
+            archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+            archive.set_cache(cache)
+            archive.analyse_data(workers=workers)
+            self.assertEqual(cache.nb_hit, len(self.entry_list))
+            for i, (path, data) in enumerate(self.entry_list):
+                self.assertEqual(archive.get_fs_data_analysed()[i], data)
+
+    def test_cache_integrity_and_eviction(self):
+        cache = FsEntryCache(os.path.join(self.temp_dir.name, "cache"), max_size=3000)
+        key_list = [FsEntryCache.compute_key(bytes([i]), 1000, True) for i in range(3)]
+        for key in key_list:
+            cache.put(key, bytes(1000))
+        self.assertIsNone(cache.get(key_list[0]))  # Least recently used removed
+        self.assertEqual(cache.get(key_list[1]), bytes(1000))
+        self.assertLessEqual(cache.get_size(), 3000)
+        with open(cache._get_file_path(key_list[2]), "r+b") as file:
+            file.seek(-1, os.SEEK_END)
+            file.write(b"\x01")
+        self.assertIsNone(cache.get(key_list[2]))
+        self.assertFalse(os.path.exists(cache._get_file_path(key_list[2])))
+
+    def test_cache_lru_order(self):
+        cache_path = os.path.join(self.temp_dir.name, "cache")
+        cache = FsEntryCache(cache_path, max_size=3000)
+        key_list = [FsEntryCache.compute_key(bytes([i]), 1000, True) for i in range(4)]
+        for key in key_list[:2]:
+            cache.put(key, bytes(1000))
+        cache.get(key_list[0])  # Now the most recently used
+        cache.put(key_list[2], bytes(1000))
+        self.assertIsNone(cache.get(key_list[1]))
+        os.utime(cache._get_file_path(key_list[0]), (0, 0))  # When reopened, the order comes from the modification times
+        cache = FsEntryCache(cache_path, max_size=3000)
+        cache.put(key_list[3], bytes(1000))
+        self.assertIsNone(cache.get(key_list[0]))
+        self.assertEqual(cache.get(key_list[2]), bytes(1000))
+
+    def test_index_sidecar(self):
+        nested_fs, nested_fi, nested_fl = build_archive_data([("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\bcgate1.inf", b"inf")])
+        nested_path = "c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1"
+        entry_list = self.entry_list + [(nested_path + ".fs", nested_fs), (nested_path + ".fi", nested_fi), (nested_path + ".fl", nested_fl)]
+        create_archive_files(self.temp_dir.name, "field", entry_list)
+        cache = FsEntryCache(os.path.join(self.temp_dir.name, "cache"))
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        archive.set_index_path(archive.get_default_index_path())
+        archive.set_cache(cache)
+        self.assertEqual(archive.get_entry(1), self.entry_list[1][1])
+        self.assertTrue(os.path.exists(archive.get_default_index_path()))
+
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        archive.set_index_path(archive.get_default_index_path())
+        archive.set_cache(cache)
+        self.assertTrue(archive._load_index_sidecar())
+        archive.analyse_data(nested=True)
+        self.assertEqual(cache.nb_hit, 1)
+        self.assertEqual(archive.get_fl_data_analysed(), [path for path, _ in entry_list])
+        self.assertEqual(len(archive.get_archive_list()), 1)
+        self.assertEqual(archive.get_data_by_path("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\bcgate1.inf"), b"inf")
+
+        # Used when opened through analyse_data or load_data: the cache keys are not computed again
+        for load in (False, True):
+            archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+            archive.set_index_path(archive.get_default_index_path())
+            archive.set_cache(cache)
+            if load:
+                archive.load_data()
+            with mock.patch.object(FsEntryCache, "compute_key", wraps=FsEntryCache.compute_key) as compute_key:
+                archive.analyse_data()
+            self.assertEqual(compute_key.call_count, 0)
+            self.assertEqual(len(archive._entry_key_list), len(entry_list))
+            self.assertEqual(bytes(archive.get_fs_data_analysed()[1]), self.entry_list[1][1])
+
+        # Invalidated when the archive changes
+        create_archive_files(self.temp_dir.name, "field", self.entry_list[:2])
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        archive.set_index_path(archive.get_default_index_path())
+        self.assertFalse(archive._load_index_sidecar())
+        self.assertEqual(archive.get_entry(1), self.entry_list[1][1])
+        self.assertEqual(archive.get_fl_data_analysed(), [path for path, _ in self.entry_list[:2]])
+        self.assertTrue(archive._load_index_sidecar())
+
+    def test_all_data_by_name(self):
+        self.archive.analyse_data()
+        found = self.archive.get_all_data_by_name("chara.one")
+        self.assertEqual([path for path, _ in found], [self.entry_list[1][0], self.entry_list[2][0]])
+
+    def test_nested(self):
+        nested_entry_list = [("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\chara.one", b"nested chara one" * 10),
+                             ("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\bcgate1.inf", b"inf")]
+        nested_fs, nested_fi, nested_fl = build_archive_data(nested_entry_list)
+        entry_list = self.entry_list + [("c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1.fs", nested_fs),
+                                        ("c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1.fi", nested_fi),
+                                        ("c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1.fl", nested_fl)]
+        create_archive_files(self.temp_dir.name, "field", entry_list)
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        archive.analyse_data(nested=True)
+        self.assertEqual(len(archive.get_archive_list()), 1)
+        nested_archive = archive.get_archive_list()[0]
+        self.assertFalse(nested_archive.is_loaded())
+        self.assertFalse(nested_archive.is_analysed())
+        found = archive.get_all_data_by_name("chara.one")
+        self.assertEqual([path for path, _ in found], [self.entry_list[1][0], self.entry_list[2][0], nested_entry_list[0][0]])
+        self.assertEqual(bytes(found[2][1]), nested_entry_list[0][1])
+        self.assertTrue(nested_archive.is_analysed())
+        self.assertEqual(b"".join(nested_archive.stream_entry(1, block_size=2)), nested_entry_list[1][1])
+        self.assertEqual(archive.get_data_by_path(nested_entry_list[1][0].upper()), nested_entry_list[1][1])
+        self.assertIsNone(archive.get_data_by_path("c:\\unknown"))
+
+    def test_nested_lookup_without_analysis(self):
+        nested_entry_list = [("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate3\\chara.one", b"nested chara one" * 10)]
+        nested_path = "c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1"
+        entry_list = self.entry_list + [(nested_path + "." + extension, data) for extension, data in
+                                        zip(("fs", "fi", "fl"), build_archive_data(nested_entry_list))]
+        create_archive_files(self.temp_dir.name, "field", entry_list)
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        self.assertIsNone(archive.get_data_by_path(nested_entry_list[0][0]))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(archive.get_data_by_path(nested_entry_list[0][0], nested=True), nested_entry_list[0][1])
+            location_list = archive.get_all_entry_location_by_name("chara.one", nested=True)
+        self.assertNotIn("Creating archive", output.getvalue())
+        self.assertEqual(location_list, [(archive, 1), (archive, 2), (archive.get_archive_list()[0], 0)])
+        self.assertFalse(archive.is_loaded())  # Only the FI/FL and the nested entries were read
+
+    def test_write(self):
+        for compression, workers in ((True, 1), (True, 2), (False, 1)):
+            fi_data_list = self.archive.write(*(os.path.join(self.temp_dir.name, "written." + extension) for extension in ("fs", "fi", "fl")),
+                                              compression=compression, workers=workers)
+            written_archive = Archive.from_folder_and_name(self.temp_dir.name, "written")
+            for i, (path, data) in enumerate(self.entry_list):
+                self.assertEqual(written_archive.get_entry(path), data)
+                self.assertEqual(fi_data_list[i].compression_used, compression)
+            self.assertEqual(written_archive.get_fi_data_analysed(), fi_data_list)
+        # Uncompressed entries are stored as is, without their size at start
+        with open(os.path.join(self.temp_dir.name, "written.fs"), "rb") as file:
+            self.assertEqual(file.read(), b"".join(data for _, data in self.entry_list))
+        # Mixed archive: the uncompressed entries are copied, the replaced one is compressed
+        written_archive.replace_entry(1, b"new chara one" * 20)
+        fi_data_list = written_archive.repack(*(os.path.join(self.temp_dir.name, "mixed." + extension) for extension in ("fs", "fi", "fl")))
+        self.assertEqual([fi_data.compression_used for fi_data in fi_data_list], [False, True, False, False])
+        mixed_archive = Archive.from_folder_and_name(self.temp_dir.name, "mixed")
+        mixed_archive.analyse_data()
+        self.assertEqual([bytes(data) for data in mixed_archive.get_fs_data_analysed()],
+                         [self.entry_list[0][1], b"new chara one" * 20, self.entry_list[2][1], self.entry_list[3][1]])
+        # Written over its own files
+        self.archive.write(self.archive._fs_path, self.archive._fi_path, self.archive._fl_path, level="fast")
+        archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+        archive.analyse_data()
+        self.assertEqual([bytes(data) for data in archive.get_fs_data_analysed()], [data for _, data in self.entry_list])
+
+    def test_repack(self):
+        new_data = b"Welcome to Trabia Garden " * 40
+        self.archive.replace_entry(self.entry_list[0][0], new_data)
+        self.assertEqual(self.archive.get_entry(0), new_data)
+        self.assertEqual(self.archive.get_replaced_entry_index_list(), [0])
+        for workers in (1, 2):
+            fi_data_list = self.archive.repack(*(os.path.join(self.temp_dir.name, "repacked." + extension) for extension in ("fs", "fi", "fl")),
+                                               workers=workers)
+            repacked_archive = Archive.from_folder_and_name(self.temp_dir.name, "repacked")
+            self.assertEqual(repacked_archive.get_entry(0), new_data)
+            self.assertEqual(fi_data_list[0].length_unpack_file, len(new_data))
+            for i in range(1, len(self.entry_list)):
+                self.assertEqual(repacked_archive.get_entry(i), self.entry_list[i][1])
+                # The compressed data of the entries not replaced is copied as is
+                self.assertEqual(repacked_archive._read_fs_slice(*repacked_archive._get_entry_bounds(i, repacked_archive._get_fs_size())),
+                                 self.archive._read_fs_slice(*self.archive._get_entry_bounds(i, self.archive._get_fs_size())))
+        # Written over its own files
+        self.archive.load_data()
+        self.archive.repack()
+        self.assertEqual(self.archive.get_replaced_entry_index_list(), [])
+        self.archive.analyse_data()
+        self.assertEqual(bytes(self.archive.get_fs_data_analysed()[0]), new_data)
+        self.assertEqual(bytes(self.archive.get_fs_data_analysed()[2]), self.entry_list[2][1])
+
+    def test_extract_all(self):
+        nested_entry_list = [("c:\\ff8\\data\\eng\\field\\mapdata\\bc\\bcgate1\\bcgate1.inf", b"inf" * 100)]
+        nested_path = "c:\\ff8\\data\\eng\\field\\mapdata\\bcgate1"
+        entry_list = self.entry_list + [(nested_path + "." + extension, data) for extension, data in
+                                        zip(("fs", "fi", "fl"), build_archive_data(nested_entry_list))]
+        create_archive_files(self.temp_dir.name, "field", entry_list)
+        for workers in (1, 2):
+            dest_folder_path = os.path.join(self.temp_dir.name, f"extract{workers}")
+            archive = Archive.from_folder_and_name(self.temp_dir.name, "field")
+            dest_path_list = archive.extract_all(dest_folder_path, workers=workers, block_size=100)
+            self.assertEqual(len(dest_path_list), len(entry_list) + len(nested_entry_list))
+            for path, data in entry_list + nested_entry_list:
+                dest_path = os.path.join(dest_folder_path, *path.split("\\")[1:])
+                with open(dest_path, "rb") as file:
+                    self.assertEqual(file.read(), data)
+        self.assertEqual(Archive.get_extract_path("dest", "c:\\ff8\\..\\init.out"), os.path.join("dest", "ff8", "init.out"))
+
+    def test_stream_entry(self):
+        for i, (path, data) in enumerate(self.entry_list):
+            self.assertEqual(b"".join(self.archive.stream_entry(i, block_size=100)), data)
+
+    def test_peek_entry(self):
+        for n_bytes in (0, 1, 10, 100000):
+            for i, (path, data) in enumerate(self.entry_list):
+                self.assertEqual(self.archive.peek_entry(i, n_bytes), data[:n_bytes])
+        self.archive.load_data()
+        self.assertEqual(self.archive.peek_entry(2, 50), self.entry_list[2][1][:50])
+
+
+class TestFsManager(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.entry_dict = {"main": [("c:\\ff8\\data\\eng\\main\\init.out", b"init" * 20)],
+                           "battle": [("c:\\ff8\\data\\eng\\battle\\c0m001.dat", b"monster" * 30),
+                                      ("c:\\ff8\\data\\eng\\battle\\init.out", b"battle init")]}
+        for name, entry_list in self.entry_dict.items():
+            create_archive_files(self.temp_dir.name, name, entry_list)
+        self.fs_manager = FsManager(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lookup(self):
+        self.assertEqual(self.fs_manager.get_archive_by_name("battle").name, "battle")
+        self.assertIsNone(self.fs_manager.get_archive_by_name("world"))
+        self.fs_manager.load_all_archive()
+        self.fs_manager.analyse_all_archive()
+        self.assertEqual(len(self.fs_manager.get_all_data_by_name("init.out")), 2)
+        self.assertEqual(self.fs_manager.get_data_by_path(self.entry_dict["battle"][0][0]), self.entry_dict["battle"][0][1])
+
+    def test_parallel_load_and_analyse(self):
+        self.fs_manager.set_cache(FsEntryCache(os.path.join(self.temp_dir.name, "cache")))
+        load_time_dict = self.fs_manager.load_all_archive(workers=2)
+        self.assertEqual(sorted(load_time_dict), ["battle", "main"])
+        analyse_time_dict = self.fs_manager.analyse_all_archive(workers=2)
+        self.assertEqual(sorted(analyse_time_dict), ["battle", "main"])
+        for name, entry_list in self.entry_dict.items():
+            archive = self.fs_manager.get_archive_by_name(name)
+            self.assertEqual(archive.get_fs_data_analysed(), [data for _, data in entry_list])
+
+    def test_pack_folder(self):
+        folder_path = os.path.join(self.temp_dir.name, "unpacked")
+        file_dict = {os.path.join("ff8", "data", "eng", "main", "init.out"): b"init" * 20,
+                     os.path.join("ff8", "data", "eng", "main", "sub", "empty.bin"): b"",
+                     os.path.join("ff8", "data", "eng", "main", "kernel.bin"): bytes(range(256)) * 10}
+        for path, data in file_dict.items():
+            os.makedirs(os.path.dirname(os.path.join(folder_path, path)), exist_ok=True)
+            with open(os.path.join(folder_path, path), "wb") as file:
+                file.write(data)
+        archive = self.fs_manager.pack_folder(folder_path, os.path.join(self.temp_dir.name, "packed"), "main", workers=2)
+        self.assertEqual(archive.get_entry_index("c:\\ff8\\data\\eng\\main\\sub\\empty.bin"), 2)
+        for path, data in file_dict.items():
+            self.assertEqual(archive.get_entry("c:\\" + path.replace(os.sep, "\\")), data)
+        # Extracting gives back the same files
+        fs_manager = FsManager(os.path.join(self.temp_dir.name, "packed"))
+        fs_manager.extract_all(os.path.join(self.temp_dir.name, "extracted"))
+        for path, data in file_dict.items():
+            with open(os.path.join(self.temp_dir.name, "extracted", path), "rb") as file:
+                self.assertEqual(file.read(), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
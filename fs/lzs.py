@@ -1,167 +1,177 @@
+import sys
 import time
 
 
 class Lzs:
-    """/!\\ Only decode have been tested"""
     N = 4096
     F = 18
     THRESHOLD = 2
-    NIL = N
+    MIN_MATCH = THRESHOLD + 1
+    MAX_DISTANCE = N - F
+    # Number of previous positions looked at in the hash chain for each byte encoded
+    LEVEL_CHAIN_DEPTH = {"fast": 4, "default": 32, "max": N}
+    PARSING_LIST = ("greedy", "lazy", "optimal")
 
-    def __init__(self):
-        self.buffer = bytearray(Lzs.N + Lzs.F)
-        self.MatchPos = 0
-        self.MatchLen = 0
-        self.Lson = [Lzs.NIL] * (Lzs.N + 1)
-        self.Rson = [Lzs.NIL] * (Lzs.N + 257)
-        self.Dad = [Lzs.NIL] * (Lzs.N + 1)
-
-    def init_tree(self):
-        for i in range(Lzs.N + 1, Lzs.N + 257):
-            self.Rson[i] = Lzs.NIL
-        for i in range(Lzs.N):
-            self.Dad[i] = Lzs.NIL
-
-    def insert_node(self, r):
-        cmp = 1
-        p = Lzs.N + 1 + self.buffer[r]
-        self.Rson[r] = self.Lson[r] = Lzs.NIL
-        self.MatchLen = 0
-        while True:
-            if cmp >= 0:
-                if self.Rson[p] != Lzs.NIL:
-                    p = self.Rson[p]
-                else:
-                    self.Rson[p] = r
-                    self.Dad[r] = p
-                    return
-            else:
-                if self.Lson[p] != Lzs.NIL:
-                    p = self.Lson[p]
-                else:
-                    self.Lson[p] = r
-                    self.Dad[r] = p
-                    return
-            for i in range(1, Lzs.F):
-                cmp = self.buffer[r + i] - self.buffer[p + i]
-                if cmp != 0:
-                    break
-            if i > self.MatchLen:
-                self.MatchPos = p
-                self.MatchLen = i
-                if self.MatchLen >= Lzs.F:
-                    break
-        self.Dad[r] = self.Dad[p]
-        self.Lson[r] = self.Lson[p]
-        self.Rson[r] = self.Rson[p]
-        self.Dad[self.Lson[p]] = r
-        self.Dad[self.Rson[p]] = r
-        if self.Rson[self.Dad[p]] == p:
-            self.Rson[self.Dad[p]] = r
-        else:
-            self.Lson[self.Dad[p]] = r
-        self.Dad[p] = Lzs.NIL
+    def encode(self, input_bytes: bytes, level="default", chain_depth=None, parsing="greedy") -> bytearray:
+        """
+        Compress the data.
+        The matches are found with hash chains over the 3 first bytes of each position, the depth of the chain searched
+        being the speed versus ratio knob.
+        The stream start with the same zero-filled ring buffer as the decoder, so the zeros at the start of the data can
+        also be referenced.
+        :param input_bytes: The data to compress
+        :param level: "fast", "default" or "max", choosing the chain depth in LEVEL_CHAIN_DEPTH
+        :param chain_depth: If set, override the chain depth given by the level
+        :param parsing: How the matches are chosen, one of PARSING_LIST:
+        "greedy" takes the longest match at each position,
+        "lazy" writes a literal byte instead when the next position has a longer match,
+        "optimal" chooses between literal bytes and matches (of any length up to the longest) with a dynamic programming
+        over the whole data to get the smallest output. Slowest and needs memory for each byte of the data.
+        :return: The compressed data
+        """
+        if chain_depth is None:
+            chain_depth = Lzs.LEVEL_CHAIN_DEPTH[level]
+        if parsing not in Lzs.PARSING_LIST:
+            raise ValueError(f"Unexpected parsing: {parsing}, expected one of {Lzs.PARSING_LIST}")
+        # The prefix has the size of the part of the ring buffer before the first byte written (position N - F),
+        # so the position in data modulo N is directly the position in the ring buffer
+        prefix_size = Lzs.N - Lzs.F
+        data = bytes(prefix_size) + bytes(input_bytes)
+        data_len = len(data)
+        ring_mask = Lzs.N - 1
+        min_match = Lzs.MIN_MATCH
+        max_distance = Lzs.MAX_DISTANCE
+        head = {}  # Last position of each 3 bytes key
+        chain = [-1] * Lzs.N  # Previous position with the same key, indexed by position in the ring buffer
+        output = bytearray()
+        flags_pos = 0
+        flag_bit = 8
 
-    def delete_node(self, p):
-        if self.Dad[p] == Lzs.NIL:
-            return
-        if self.Rson[p] == Lzs.NIL:
-            q = self.Lson[p]
-        elif self.Lson[p] == Lzs.NIL:
-            q = self.Rson[p]
-        else:
-            q = self.Lson[p]
-            if self.Rson[q] != Lzs.NIL:
-                while self.Rson[q] != Lzs.NIL:
-                    q = self.Rson[q]
-                self.Rson[self.Dad[q]] = self.Lson[q]
-                self.Dad[self.Lson[q]] = self.Dad[q]
-                self.Lson[q] = self.Lson[p]
-                self.Dad[self.Lson[p]] = q
-            self.Rson[q] = self.Rson[p]
-            self.Dad[self.Rson[p]] = q
-        self.Dad[q] = self.Dad[p]
-        if self.Rson[self.Dad[p]] == p:
-            self.Rson[self.Dad[p]] = q
-        else:
-            self.Lson[self.Dad[p]] = q
-        self.Dad[p] = Lzs.NIL
-
-    def encode(self, input_bytes: bytearray) -> bytearray:
-        output_bytes = bytearray()
-        self.init_tree()
-        code_buf = bytearray(17)
-        code_buf[0] = 0
-        code_buf_ptr = mask = 1
-        s = 0
-        r = Lzs.N - Lzs.F
-        len_input = len(input_bytes)
-        input_pos = 0
+        def insert(position):
+            if position + min_match <= data_len:
+                key = data[position:position + min_match]
+                chain[position & ring_mask] = head.get(key, -1)
+                head[key] = position
 
-        for i in range(s, r):
-            self.buffer[i] = 0
+        def find_match(position) -> (int, int):
+            """Give the length and position of the longest match, among the previous positions inserted"""
+            max_len = min(Lzs.F, data_len - position)
+            best_len = 0
+            best_pos = 0
+            if max_len < min_match:
+                return best_len, best_pos
+            candidate = head.get(data[position:position + min_match], -1)
+            min_pos = position - max_distance
+            depth = chain_depth
+            target = data[position:position + max_len]
+            while candidate >= min_pos and depth > 0:
+                if data[candidate + best_len] == target[best_len]:  # Can't be longer than the best otherwise
+                    if data[candidate:candidate + max_len] == target:
+                        return max_len, candidate
+                    length = min_match
+                    while data[candidate + length] == target[length]:
+                        length += 1
+                    if length > best_len:
+                        best_len = length
+                        best_pos = candidate
+                depth -= 1
+                candidate = chain[candidate & ring_mask]
+            return best_len, best_pos
 
-        len_bytes = 0
-        for len_bytes in range(Lzs.F):
-            if input_pos < len_input:
-                self.buffer[r + len_bytes] = input_bytes[input_pos]
-                input_pos += 1
+        def write_item(length, position):
+            """Write a match of this length from this position, or the literal byte at this position if too short"""
+            nonlocal flags_pos, flag_bit
+            if flag_bit == 8:
+                flags_pos = len(output)
+                output.append(0)
+                flag_bit = 0
+            if length >= min_match:
+                offset = position & ring_mask
+                output.append(offset & 0xFF)
+                output.append(((offset >> 4) & 0xF0) | (length - min_match))
             else:
-                break
-        if len_bytes == 0:
-            return bytearray()
-
-        for i in range(1, Lzs.F + 1):
-            self.insert_node(r - i)
-        self.insert_node(r)
-
-        while len_bytes > 0:
-            if self.MatchLen > len_bytes:
-                self.MatchLen = len_bytes
-            if self.MatchLen <= Lzs.THRESHOLD:
-                self.MatchLen = 1
-                code_buf[0] |= mask
-                code_buf[code_buf_ptr] = self.buffer[r]
-                code_buf_ptr += 1
-            else:
-                code_buf[code_buf_ptr] = self.MatchPos & 0xFF
-                code_buf_ptr += 1
-                code_buf[code_buf_ptr] = ((self.MatchPos >> 4) & 0xF0) | (self.MatchLen - (Lzs.THRESHOLD + 1))
-                code_buf_ptr += 1
-
-            if (mask := mask << 1) == 0x100:
-                output_bytes.extend(code_buf[:code_buf_ptr])
-                code_buf[0] = 0
-                code_buf_ptr = 1
-                mask = 1
-
-            last_match_length = self.MatchLen
-            for i in range(last_match_length):
-                if input_pos < len_input:
-                    self.delete_node(s)
-                    self.buffer[s] = input_bytes[input_pos]
-                    input_pos += 1
-                    if s < Lzs.F - 1:
-                        self.buffer[s + Lzs.N] = input_bytes[input_pos - 1]
-                    s = (s + 1) & (Lzs.N - 1)
-                    r = (r + 1) & (Lzs.N - 1)
-                    self.insert_node(r)
-                else:
-                    break
+                output[flags_pos] |= 1 << flag_bit
+                output.append(data[position])
+            flag_bit += 1
 
-            len_bytes -= last_match_length
+        for pos in range(prefix_size):
+            insert(pos)
 
-        if code_buf_ptr > 1:
-            output_bytes.extend(code_buf[:code_buf_ptr])
+        pos = prefix_size
+        if parsing == "greedy":
+            while pos < data_len:
+                length, match_pos = find_match(pos)
+                if length >= min_match:
+                    write_item(length, match_pos)
+                    for i in range(pos, pos + length):
+                        insert(i)
+                    pos += length
+                else:
+                    write_item(1, pos)
+                    insert(pos)
+                    pos += 1
+        elif parsing == "lazy":
+            length, match_pos = find_match(pos)
+            while pos < data_len:
+                insert(pos)
+                if min_match <= length < Lzs.F:
+                    next_length, next_match_pos = find_match(pos + 1)
+                    if next_length > length:  # Better to wait one byte
+                        write_item(1, pos)
+                        pos += 1
+                        length, match_pos = next_length, next_match_pos
+                        continue
+                if length >= min_match:
+                    write_item(length, match_pos)
+                    for i in range(pos + 1, pos + length):
+                        insert(i)
+                    pos += length
+                else:
+                    write_item(1, pos)
+                    pos += 1
+                length, match_pos = find_match(pos)
+        else:
+            # Longest match of each position, then cost in bits of the end of the data from each position
+            # (literal byte: 1 flag bit + 8, match: 1 flag bit + 16)
+            nb_byte = data_len - prefix_size
+            match_length_list = [0] * nb_byte
+            match_pos_list = [0] * nb_byte
+            for i in range(nb_byte):
+                match_length_list[i], match_pos_list[i] = find_match(pos + i)
+                insert(pos + i)
+            cost_list = [0] * (nb_byte + 1)
+            choice_list = [1] * nb_byte
+            for i in range(nb_byte - 1, -1, -1):
+                best_cost = 9 + cost_list[i + 1]
+                best_length = 1
+                for length in range(min_match, match_length_list[i] + 1):
+                    cost = 17 + cost_list[i + length]
+                    if cost <= best_cost:
+                        best_cost = cost
+                        best_length = length
+                cost_list[i] = best_cost
+                choice_list[i] = best_length
+            i = 0
+            while i < nb_byte:
+                write_item(choice_list[i], match_pos_list[i] if choice_list[i] >= min_match else pos + i)
+                i += choice_list[i]
 
-        return output_bytes
+        return output
 
-    def decode(self, input_bytes: bytes):
+    def decode(self, input_bytes: bytes, max_output=None):
+        """
+        Generator decoding the data byte by byte
+        :param input_bytes: The compressed data
+        :param max_output: If set, the decoding stops as soon as this number of bytes is produced
+        """
+        remaining_output = -1 if max_output is None else max_output
+        if remaining_output == 0:
+            return
         flags = 0
         input_pos = 0
         r = Lzs.N - Lzs.F
         buffer_size = Lzs.N - 1
-        buffer = self.buffer  # Cache buffer for faster access
+        buffer = bytearray(Lzs.N)  # Own ring buffer, so several generators can be consumed at the same time
         input_len = len(input_bytes)  # Cache length of input_bytes
 
         def get_byte():
@@ -188,6 +198,9 @@ class Lzs:
                 buffer[r] = byte
                 r = (r + 1) & buffer_size
                 yield byte
+                remaining_output -= 1
+                if remaining_output == 0:
+                    return
             else:  # Compressed sequence case
                 i = get_byte()
                 j = get_byte()
@@ -204,10 +217,171 @@ class Lzs:
                     buffer[r] = byte
                     r = (r + 1) & buffer_size
                     yield byte
+                    remaining_output -= 1
+                    if remaining_output == 0:
+                        return
 
             # Right-shift the flags for the next round
             flags >>= 1
 
+    def decode_to_bytes(self, input_bytes: bytes, expected_size: int = 0, max_output=None) -> bytearray:
+        """
+        Decode the whole input at once in a preallocated buffer instead of yielding each byte.
+        The back-references are copied by slice (repeating the pattern when the reference overlaps the output).
+        No ring buffer is used: the history is the output itself, with the zero-filled start of the ring buffer that the
+        decoder always begins with.
+        :param input_bytes: The compressed data
+        :param expected_size: The size of the decompressed data (length_unpack_file in the FI). The buffer grows if the data
+        is bigger, and is cut if smaller.
+        :param max_output: If set, the decoding stops as soon as this number of bytes is produced
+        :return: The decompressed data
+        """
+        output = bytearray(expected_size)
+        output_size = expected_size
+        output_pos = 0
+        input_pos = 0
+        input_len = len(input_bytes)
+        ring_start = Lzs.N - Lzs.F
+        ring_mask = Lzs.N - 1
+        min_length = Lzs.THRESHOLD + 1
+        output_limit = sys.maxsize if max_output is None else max_output
+
+        while input_pos < input_len and output_pos < output_limit:
+            flags = input_bytes[input_pos]
+            input_pos += 1
+            if flags == 0xFF and input_pos + 8 <= input_len:  # Only literal bytes, copied in one go
+                output[output_pos:output_pos + 8] = input_bytes[input_pos:input_pos + 8]
+                output_pos += 8
+                input_pos += 8
+                if output_pos > output_size:
+                    output_size = output_pos
+                continue
+            for _ in range(8):
+                if input_pos >= input_len:
+                    break
+                if flags & 1:  # Literal byte case
+                    if output_pos < output_size:
+                        output[output_pos] = input_bytes[input_pos]
+                    else:
+                        output.append(input_bytes[input_pos])
+                        output_size += 1
+                    output_pos += 1
+                    input_pos += 1
+                else:  # Compressed sequence case
+                    if input_pos + 1 >= input_len:
+                        input_pos = input_len
+                        break
+                    i = input_bytes[input_pos]
+                    j = input_bytes[input_pos + 1]
+                    input_pos += 2
+                    length = (j & 0x0F) + min_length
+                    # Distance between the current position in the ring buffer and the position referenced (1 to N)
+                    distance = ((ring_start + output_pos - (i | ((j & 0xF0) << 4)) - 1) & ring_mask) + 1
+                    source_pos = output_pos - distance
+                    if source_pos < 0:  # Reference the zero-filled start of the ring buffer
+                        sequence = bytearray(length)
+                        for k in range(length):
+                            if source_pos + k >= 0:
+                                sequence[k] = output[source_pos + k] if source_pos + k < output_pos else sequence[k - distance]
+                    elif distance >= length:
+                        sequence = output[source_pos:source_pos + length]
+                    else:  # Overlapping reference, the pattern repeats itself
+                        sequence = (output[source_pos:output_pos] * (length // distance + 1))[:length]
+                    output[output_pos:output_pos + length] = sequence
+                    output_pos += length
+                    if output_pos > output_size:
+                        output_size = output_pos
+                flags >>= 1
+
+        if output_pos > output_limit:
+            output_pos = output_limit
+        if output_pos < output_size:
+            del output[output_pos:]
+        return output
+
+class LzsDecoder:
+    """
+    Incremental decoder: the compressed data is given chunk by chunk with feed, which returns what could be decoded.
+    The decoder owns its ring buffer (the last N bytes decoded), so the memory used stays bounded whatever the size of the
+    entry, and several decoders can run at the same time.
+    """
+
+    def __init__(self):
+        self._history = bytearray(Lzs.N)  # Starts as the zero-filled ring buffer
+        self._output_size = 0
+        self._flags = 0
+        self._pending = b""  # Input not yet usable (item cut between two chunks)
+
+    def reset(self):
+        """Put back the decoder in its initial state, to decode a new stream"""
+        self._history = bytearray(Lzs.N)
+        self._output_size = 0
+        self._flags = 0
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        """
+        Decode a new chunk of compressed data
+        :param chunk: The next compressed bytes
+        :return: The bytes decoded with this chunk (can be empty if the chunk only completed a flag byte)
+        """
+        data = self._pending + bytes(chunk)
+        data_len = len(data)
+        data_pos = 0
+        buffer = self._history
+        history_size = len(buffer)
+        ring_start = Lzs.N - Lzs.F
+        ring_mask = Lzs.N - 1
+        min_length = Lzs.THRESHOLD + 1
+        flags = self._flags
+
+        while True:
+            if flags & 0x100 == 0:
+                if data_pos >= data_len:
+                    break
+                flags = data[data_pos] | 0xFF00
+                data_pos += 1
+            if flags & 1:  # Literal byte case
+                if data_pos >= data_len:
+                    break
+                buffer.append(data[data_pos])
+                data_pos += 1
+            else:  # Compressed sequence case
+                if data_pos + 1 >= data_len:
+                    break
+                i = data[data_pos]
+                j = data[data_pos + 1]
+                data_pos += 2
+                length = (j & 0x0F) + min_length
+                output_pos = self._output_size + len(buffer) - history_size
+                distance = ((ring_start + output_pos - (i | ((j & 0xF0) << 4)) - 1) & ring_mask) + 1
+                source_pos = len(buffer) - distance
+                if distance >= length:
+                    buffer.extend(buffer[source_pos:source_pos + length])
+                else:  # Overlapping reference, the pattern repeats itself
+                    buffer.extend((buffer[source_pos:] * (length // distance + 1))[:length])
+            flags >>= 1
+
+        self._flags = flags
+        self._pending = data[data_pos:]
+        output = bytes(buffer[history_size:])
+        self._output_size += len(output)
+        del buffer[:-Lzs.N]
+        return output
+
+    def flush(self) -> bytes:
+        """
+        End the stream and reset the decoder so it can be used for a new one.
+        An item cut at the end of the stream can't be decoded and is dropped, as with Lzs.decode
+        :return: The remaining decoded bytes (always empty, as everything decodable is returned by feed)
+        """
+        self.reset()
+        return b""
+
+    def get_output_size(self) -> int:
+        return self._output_size
+
+
 def test_result():
 
     original_hex = bytes(
@@ -229,5 +403,6 @@ def test_result():
     print("Test passed:", return_value == expected_decoded_hex)
     return return_value == expected_decoded_hex
 
+
 if __name__ == "__main__":
-    test_result()
\ No newline at end of file
+    test_result()
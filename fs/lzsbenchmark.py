@@ -0,0 +1,294 @@
+import argparse
+import gc
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+from fs.lzs import Lzs
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "lzsbenchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.2  # Allowed slowdown (or ratio increase) compared to the baseline, 0.2 means 20%
+DEFAULT_REPEAT = 5  # Best of several samples, as a single one is too noisy to compare with the baseline
+MIN_SAMPLE_TIME = 0.1  # In seconds, a faster operation is repeated in each sample
+FF8_WORD_LIST = ("Squall", "Rinoa", "Quistis", "Zell", "Selphie", "Irvine", "Seifer", "Edea", "Laguna", "Potion",
+                 "Hi-Potion", "Phoenix Down", "Fire", "Fira", "Firaga", "Blizzard", "Thunder", "Cure", "Esuna",
+                 "Junction", "Draw", "GF", "Garden", "Balamb", "Galbadia", "SeeD", "received", "Learned", "the", "of",
+                 "HP", "Str", "Vit", "Mag", "Spr", "Spd", "Luck", "Hit", "Eva")
+
+
+def generate_random(size: int, rng: random.Random) -> bytes:
+    """Incompressible data"""
+    return rng.randbytes(size)
+
+
+def generate_repetitive(size: int, rng: random.Random) -> bytes:
+    """Long runs of zeros and small repeated patterns"""
+    data = bytearray()
+    while len(data) < size:
+        if rng.random() < 0.5:
+            data.extend(bytes(rng.randrange(16, 512)))
+        else:
+            data.extend(rng.randbytes(rng.randrange(1, 8)) * rng.randrange(4, 64))
+    return bytes(data[:size])
+
+
+def generate_text(size: int, rng: random.Random) -> bytes:
+    """Null terminated strings made of FF8 words and control codes, as in the msd or mngrp texts"""
+    data = bytearray()
+    while len(data) < size:
+        sentence = bytearray()
+        for _ in range(rng.randrange(2, 12)):
+            if rng.random() < 0.1:  # Character name or color control code
+                sentence.extend((rng.choice((0x03, 0x06)), rng.randrange(0x20, 0x3B)))
+            else:
+                sentence.extend(rng.choice(FF8_WORD_LIST).encode("ascii"))
+            sentence.append(0x20)
+        sentence[-1] = 0x00
+        data.extend(sentence)
+    return bytes(data[:size])
+
+
+def generate_texture(size: int, rng: random.Random) -> bytes:
+    """TIM like data: a header, a 16 bits CLUT and 8 bits indexed pixels made of gradients and flat areas"""
+    data = bytearray(struct.pack("<II", 0x10, 0x09))
+    data.extend(struct.pack("<IHHHH", 12 + 256 * 2, 0, 0, 256, 1))
+    for _ in range(256):
+        data.extend(struct.pack("<H", rng.randrange(0x8000)))
+    width = 256
+    data.extend(struct.pack("<IHHHH", 0, 0, 0, width // 2, size // width))
+    y = 0
+    while len(data) < size:
+        start_color = rng.randrange(256)
+        for x in range(width):
+            if (x // 32 + y // 32) % 3 == 0:
+                data.append(start_color)
+            else:
+                data.append((start_color + x // 4 + y // 8) & 0xFF)
+        y += 1
+    return bytes(data[:size])
+
+
+def generate_model(size: int, rng: random.Random) -> bytes:
+    """Vertex list in 16 bits signed coordinates moving by small steps, followed by triangle indexes"""
+    data = bytearray()
+    nb_vertex = max(1, size // 16)
+    x, y, z = 0, 0, 0
+    for _ in range(nb_vertex):
+        x = max(-0x8000, min(0x7FFF, x + rng.randrange(-64, 65)))
+        y = max(-0x8000, min(0x7FFF, y + rng.randrange(-64, 65)))
+        z = max(-0x8000, min(0x7FFF, z + rng.randrange(-64, 65)))
+        data.extend(struct.pack("<hhhh", x, y, z, 0))
+    while len(data) < size:
+        vertex = rng.randrange(nb_vertex - 2) if nb_vertex > 2 else 0
+        data.extend(struct.pack("<HHHH", vertex, vertex + 1, vertex + 2, 0x0008))
+    return bytes(data[:size])
+
+
+def generate_synthetic_stream(output_size: int, seed=0) -> bytes:
+    """
+    Generate a valid compressed stream mixing literal bytes and back-references, without needing the encoder.
+    :param output_size: The size of the data once decompressed
+    :param seed: The seed of the random generator, to have reproducible streams
+    :return: The compressed stream
+    """
+    rng = random.Random(seed)
+    stream = bytearray()
+    output_pos = 0
+    while output_pos < output_size:
+        flags_pos = len(stream)
+        stream.append(0)
+        for bit in range(8):
+            if output_pos >= output_size:
+                break
+            if rng.random() < 0.4:
+                stream[flags_pos] |= 1 << bit
+                stream.append(rng.randrange(256))
+                output_pos += 1
+            else:
+                length = rng.randrange(Lzs.THRESHOLD + 1, Lzs.F + 1)
+                offset = rng.randrange(Lzs.N)
+                stream.append(offset & 0xFF)
+                stream.append(((offset >> 4) & 0xF0) | (length - (Lzs.THRESHOLD + 1)))
+                output_pos += length
+    return bytes(stream)
+
+
+def benchmark_decode(output_size=4 * 1024 * 1024):
+    """Compare the generator decode with decode_to_bytes on a synthetic stream"""
+    compressed = generate_synthetic_stream(output_size)
+
+    start_time = time.perf_counter()
+    generator_value = bytes(Lzs().decode(input_bytes=compressed))
+    generator_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    bulk_value = Lzs().decode_to_bytes(input_bytes=compressed, expected_size=len(generator_value))
+    bulk_time = time.perf_counter() - start_time
+
+    size_mb = len(generator_value) / (1024 * 1024)
+    print(f"Decoded {size_mb:.2f} MB from {len(compressed) / (1024 * 1024):.2f} MB")
+    print(f"decode: {generator_time:.3f} seconds ({size_mb / generator_time:.2f} MB/s)")
+    print(f"decode_to_bytes: {bulk_time:.3f} seconds ({size_mb / bulk_time:.2f} MB/s)")
+    print("Same result:", generator_value == bulk_value)
+    return generator_value == bulk_value
+
+
+CORPUS_GENERATOR_DICT = {"random": generate_random, "repetitive": generate_repetitive, "text": generate_text,
+                         "texture": generate_texture, "model": generate_model}
+
+
+def generate_corpora(size: int, seed=0) -> dict[str, bytes]:
+    """
+    Generate all the corpora, always the same for the same size and seed
+    :param size: The size of each corpus
+    :param seed: The seed of the random generator
+    :return: Dict of corpus name to data
+    """
+    return {name: generator(size, random.Random(f"{seed}-{name}")) for name, generator in CORPUS_GENERATOR_DICT.items()}
+
+
+def measure_best_time(function, repeat=DEFAULT_REPEAT, min_sample_time=MIN_SAMPLE_TIME) -> float:
+    """
+    Time a function like timeit: the garbage collector is disabled, and each sample calls the function as many times as
+    needed to last min_sample_time, so a short call is not lost in the noise of the timer and of the scheduler
+    :param function: The function to time, without argument
+    :param repeat: The number of samples, the best one is kept
+    :param min_sample_time: The minimum duration in seconds of a sample
+    :return: The best time of one call in seconds
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start_time = time.perf_counter()
+        function()
+        nb_call = max(1, int(min_sample_time / max(time.perf_counter() - start_time, 1e-9)))
+        best_time = float("inf")
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            for _ in range(nb_call):
+                function()
+            best_time = min(best_time, (time.perf_counter() - start_time) / nb_call)
+        return best_time
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def benchmark_corpus(data: bytes, level="default", parsing="greedy", repeat=DEFAULT_REPEAT) -> dict:
+    """
+    Encode and decode a corpus, keeping the best time of each
+    :param data: The corpus
+    :param level: The level of the encoding
+    :param parsing: The parsing of the encoding
+    :param repeat: The number of timing samples of each operation
+    :return: Dict with the throughput (in MB/s of uncompressed data), ratio and round trip result
+    """
+    size_mb = len(data) / (1024 * 1024)
+    compressed = Lzs().encode(data, level=level, parsing=parsing)
+    decoded = Lzs().decode_to_bytes(compressed, len(data))
+    encode_time = measure_best_time(lambda: Lzs().encode(data, level=level, parsing=parsing), repeat)
+    decode_time = measure_best_time(lambda: Lzs().decode_to_bytes(compressed, len(data)), repeat)
+    return {"encode_mb_s": size_mb / encode_time if encode_time else 0.0,
+            "decode_mb_s": size_mb / decode_time if decode_time else 0.0,
+            "ratio": len(compressed) / len(data) if data else 0.0,
+            "round_trip": decoded == data}
+
+
+def run_benchmark(size=1024 * 1024, seed=0, level="default", parsing="greedy", repeat=DEFAULT_REPEAT) -> dict[str, dict]:
+    """Benchmark all the corpora, printing the result of each one"""
+    result_dict = {}
+    for name, data in generate_corpora(size, seed).items():
+        result_dict[name] = benchmark_corpus(data, level=level, parsing=parsing, repeat=repeat)
+        result = result_dict[name]
+        print(f"{name:<12} encode: {result['encode_mb_s']:7.3f} MB/s - decode: {result['decode_mb_s']:7.3f} MB/s - "
+              f"ratio: {result['ratio']:.4f} - round trip: {result['round_trip']}")
+    return result_dict
+
+
+def compare_parsing(size=256 * 1024, seed=0, level="default") -> dict[str, dict[str, dict]]:
+    """
+    Benchmark each parsing of the encoder on all the corpora, printing the ratio and encoding time next to the greedy one
+    :return: Dict of parsing to the result of run_benchmark
+    """
+    parsing_result_dict = {}
+    corpora = generate_corpora(size, seed)
+    for parsing in Lzs.PARSING_LIST:
+        parsing_result_dict[parsing] = {name: benchmark_corpus(data, level=level, parsing=parsing) for name, data in corpora.items()}
+    for name in corpora:
+        greedy_result = parsing_result_dict["greedy"][name]
+        for parsing in Lzs.PARSING_LIST:
+            result = parsing_result_dict[parsing][name]
+            print(f"{name:<12} {parsing:<8} ratio: {result['ratio']:.4f} ({result['ratio'] / greedy_result['ratio'] if greedy_result['ratio'] else 0:.3f}x greedy) - "
+                  f"encode: {result['encode_mb_s']:7.3f} MB/s ({greedy_result['encode_mb_s'] / result['encode_mb_s']:.2f}x greedy time) - "
+                  f"round trip: {result['round_trip']}")
+    return parsing_result_dict
+
+
+def compare_with_baseline(result_dict: dict[str, dict], baseline_dict: dict[str, dict], threshold=DEFAULT_THRESHOLD) -> list[str]:
+    """
+    Compare a benchmark with the baseline
+    :param result_dict: The result of run_benchmark
+    :param baseline_dict: The result of a previous run_benchmark
+    :param threshold: The allowed regression, 0.2 means 20% slower or 20% bigger
+    :return: The list of regressions found (empty if none)
+    """
+    regression_list = []
+    for name, result in result_dict.items():
+        if not result["round_trip"]:
+            regression_list.append(f"{name}: round trip failed")
+        if name not in baseline_dict:
+            continue
+        baseline = baseline_dict[name]
+        for key in ("encode_mb_s", "decode_mb_s"):
+            if result[key] < baseline[key] * (1 - threshold):
+                regression_list.append(f"{name}: {key} {result[key]:.3f} < baseline {baseline[key]:.3f}")
+        if result["ratio"] > baseline["ratio"] * (1 + threshold):
+            regression_list.append(f"{name}: ratio {result['ratio']:.4f} > baseline {baseline['ratio']:.4f}")
+    return regression_list
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark of the LZS codec on synthetic corpora")
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="Size of each corpus in bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level", default="default", choices=Lzs.LEVEL_CHAIN_DEPTH.keys())
+    parser.add_argument("--parsing", default="greedy", choices=Lzs.PARSING_LIST)
+    parser.add_argument("--compare-parsing", action="store_true", help="Only compare the ratio and time of each parsing")
+    parser.add_argument("--compare-decode", action="store_true", help="Only compare decode with decode_to_bytes on a synthetic stream")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Number of runs, the best one is kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Path of the JSON baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true", help="Save the result as the new baseline")
+    args = parser.parse_args(argv)
+
+    if args.compare_decode:
+        return 0 if benchmark_decode(args.size) else 1
+
+    if args.compare_parsing:
+        parsing_result_dict = compare_parsing(size=args.size, seed=args.seed, level=args.level)
+        return 0 if all(result["round_trip"] for result_dict in parsing_result_dict.values() for result in result_dict.values()) else 1
+
+    parameter_dict = {"size": args.size, "seed": args.seed, "level": args.level, "parsing": args.parsing}
+    result_dict = run_benchmark(size=args.size, seed=args.seed, level=args.level, parsing=args.parsing, repeat=args.repeat)
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf8") as file:
+            json.dump({"parameters": parameter_dict, "results": result_dict}, file, indent=4)
+        print(f"Baseline saved in {args.baseline}")
+        return 0 if all(result["round_trip"] for result in result_dict.values()) else 1
+
+    with open(args.baseline, "r", encoding="utf8") as file:
+        baseline = json.load(file)
+    if baseline["parameters"] != parameter_dict:
+        print(f"The baseline was done with other parameters: {baseline['parameters']}")
+        return 1
+    regression_list = compare_with_baseline(result_dict, baseline["results"], args.threshold)
+    for regression in regression_list:
+        print(f"Regression: {regression}")
+    return 1 if regression_list else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import random
+import unittest
+
+from fs.lzs import Lzs, LzsDecoder
+from fs.lzsbenchmark import benchmark_corpus, compare_with_baseline, generate_corpora, generate_synthetic_stream
+
+
+class TestLzs(unittest.TestCase):
+
+    def setUp(self):
+        self.compressed = bytes(
+            b'\xF5\x10\xEB\xF0\x09\xEB\xF0\x0C\x04\x00\x00\xFF\x40\x01\xF0\x00\x00\x01\x02\x00\xFF\xFF\xFF\xFE\xFF\xFC\xFF\xDE\xFB\xFF\xFA\xFF\xF7\xFF\x9C\xF3\xF4\xFF\xFF\x7B\xEF\xF1\xFF\x5A'
+        )
+        self.decoded = bytes(
+            b'\x10\x00\x00\x00\x09\x00\x00\x00\x0C\x04\x00\x00\x40\x01\xF0\x00\x00\x01\x02\x00\xFF\xFF\xFE\xFF\xFC\xFF\xDE\xFB\xFA\xFF\xF7\xFF\x9C\xF3\xF4\xFF\x7B\xEF\xF1\xFF\x5A'
+        )
+
+    def test_decode(self):
+        self.assertEqual(bytes(Lzs().decode(self.compressed)), self.decoded)
+
+    def test_decode_to_bytes(self):
+        self.assertEqual(Lzs().decode_to_bytes(self.compressed, len(self.decoded)), self.decoded)
+        # Wrong expected size must not change the result
+        self.assertEqual(Lzs().decode_to_bytes(self.compressed), self.decoded)
+        self.assertEqual(Lzs().decode_to_bytes(self.compressed, len(self.decoded) + 100), self.decoded)
+
+    def test_decode_to_bytes_synthetic(self):
+        for seed in range(50):
+            size = random.Random(seed).randrange(0, 20000)
+            compressed = generate_synthetic_stream(size, seed)
+            expected = bytes(Lzs().decode(compressed))
+            self.assertEqual(Lzs().decode_to_bytes(compressed, len(expected)), expected)
+
+    def test_encode_round_trip(self):
+        rng = random.Random(0)
+        data_list = [b"", b"a", bytes(5000), rng.randbytes(5000), bytes(rng.choice(b"abc\x00") for _ in range(20000)),
+                     b"Squall Leonhart " * 500]
+        for data in data_list:
+            for level in Lzs.LEVEL_CHAIN_DEPTH:
+                for parsing in Lzs.PARSING_LIST:
+                    compressed = Lzs().encode(data, level=level, parsing=parsing)
+                    self.assertEqual(Lzs().decode_to_bytes(compressed, len(data)), data)
+                    self.assertEqual(bytes(Lzs().decode(compressed)), data)
+
+    def test_encode_level_ratio(self):
+        rng = random.Random(1)
+        data = bytes(rng.choice(b"abcdef") for _ in range(20000))
+        self.assertLessEqual(len(Lzs().encode(data, level="max")), len(Lzs().encode(data, level="fast")))
+        self.assertLess(len(Lzs().encode(bytes(10000))), 1500)
+
+    def test_encode_parsing_ratio(self):
+        for name, data in generate_corpora(20000).items():
+            greedy_size = len(Lzs().encode(data, parsing="greedy"))
+            lazy_size = len(Lzs().encode(data, parsing="lazy"))
+            optimal_size = len(Lzs().encode(data, parsing="optimal"))
+            self.assertLessEqual(optimal_size, greedy_size, name)
+            self.assertLessEqual(optimal_size, lazy_size, name)
+
+    def test_decoder_feed(self):
+        for seed in range(20):
+            compressed = generate_synthetic_stream(random.Random(seed).randrange(0, 30000), seed)
+            expected = Lzs().decode_to_bytes(compressed)
+            for chunk_size in (1, 2, 3, 7, 4096):
+                decoder = LzsDecoder()
+                output = bytearray()
+                for pos in range(0, len(compressed), chunk_size):
+                    output.extend(decoder.feed(compressed[pos:pos + chunk_size]))
+                output.extend(decoder.flush())
+                self.assertEqual(output, expected)
+
+    def test_decoder_interleaved(self):
+        compressed_list = [generate_synthetic_stream(10000, seed) for seed in range(3)]
+        decoder_list = [LzsDecoder() for _ in compressed_list]
+        output_list = [bytearray() for _ in compressed_list]
+        for pos in range(0, 10000, 100):
+            for i, decoder in enumerate(decoder_list):
+                output_list[i].extend(decoder.feed(compressed_list[i][pos:pos + 100]))
+        for i, compressed in enumerate(compressed_list):
+            self.assertEqual(output_list[i], Lzs().decode_to_bytes(compressed))
+        # The generator has its own ring buffer too
+        lzs = Lzs()
+        generator_list = [lzs.decode(compressed) for compressed in compressed_list]
+        interleaved = [bytearray(), bytearray(), bytearray()]
+        for values in zip(*generator_list):
+            for i, value in enumerate(values):
+                interleaved[i].append(value)
+        for i, compressed in enumerate(compressed_list):
+            self.assertTrue(Lzs().decode_to_bytes(compressed).startswith(interleaved[i]))
+
+    def test_max_output(self):
+        compressed = generate_synthetic_stream(20000, 3)
+        expected = Lzs().decode_to_bytes(compressed)
+        for max_output in (0, 1, 5, 17, 1000, 20000, 30000):
+            self.assertEqual(bytes(Lzs().decode(compressed, max_output=max_output)), expected[:max_output])
+            self.assertEqual(Lzs().decode_to_bytes(compressed, max_output=max_output), expected[:max_output])
+
+    def test_corpora_round_trip(self):
+        corpora = generate_corpora(20000)
+        self.assertEqual(corpora, generate_corpora(20000))
+        result_dict = {name: benchmark_corpus(data, repeat=1) for name, data in corpora.items()}
+        for name, result in result_dict.items():
+            self.assertTrue(result["round_trip"], name)
+        self.assertGreater(result_dict["random"]["ratio"], 1)
+        self.assertLess(result_dict["repetitive"]["ratio"], 0.5)
+        self.assertEqual(compare_with_baseline(result_dict, result_dict), [])
+        slower_dict = {name: dict(result, decode_mb_s=result["decode_mb_s"] / 2) for name, result in result_dict.items()}
+        self.assertEqual(len(compare_with_baseline(slower_dict, result_dict)), len(result_dict))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
+import functools
 import json
+import hashlib
+import io
 import os
+import pickle
+import re
+import tempfile
+import time
+from collections import OrderedDict
 from enum import Enum
 
-from PIL import Image
-
 
 class LangType(Enum):
     ENGLISH = 0
@@ -190,35 +196,104 @@ class AIData:
     COLOR = "#0055ff"
 
 
+class _LazyResource:
+    """
+    Attribute of GameData loaded by its load method at the first access.
+    The load method sets the attribute on the instance, which then hides this descriptor: the next accesses are direct.
+    """
+
+    def __init__(self, load_method_name: str):
+        self.load_method_name = load_method_name
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance._load_resource_cache_once()
+        if self.name not in instance.__dict__:
+            getattr(instance, self.load_method_name)()
+        return instance.__dict__[self.name]
+
+
+class _ResourceCachePickler(pickle.Pickler):
+    """
+    Save the enums of this module by name, so the resource cache doesn't depend on the name this module is imported
+    with (gamedata or FF8GameData.gamedata), which would give enum members of another class when loaded.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Enum) and type(obj).__module__ == __name__:
+            return type(obj).__name__, obj.name
+        return None
+
+
+class _ResourceCacheUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        enum_name, member_name = pid
+        return globals()[enum_name][member_name]
+
+
+def _record_load_time(load_method):
+    """Decorator of the load methods of GameData, saving the time spent by each one in load_time_dict"""
+    @functools.wraps(load_method)
+    def wrapper(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        result = load_method(self, *args, **kwargs)
+        self.load_time_dict[load_method.__name__] = time.perf_counter() - start_time
+        return result
+    return wrapper
+
+
 class GameData:
     AIData = AIData()
+    RESOURCE_CACHE_VERSION = 1  # To increase when the post-processing of a load method changes
+    RESOURCE_CACHE_FILE_NAME = "resource_cache.pickle"
+    # Each resource is loaded at the first access, so only the resources used are read
+    devour_data_json = _LazyResource("load_devour_data")
+    magic_data_json = _LazyResource("load_magic_data")
+    enemy_abilities_data_json = _LazyResource("load_enemy_abilities_data")
+    gforce_data_json = _LazyResource("load_gforce_data")
+    item_data_json = _LazyResource("load_item_data")
+    draw_data_json = _LazyResource("load_draw_data")
+    special_action_data_json = _LazyResource("load_special_action_data")
+    field_data_json = _LazyResource("load_field_data")
+    stat_data_json = _LazyResource("load_stat_data")
+    monster_data_json = _LazyResource("load_monster_data")
+    status_data_json = _LazyResource("load_status_data")
+    sysfnt_data_json = _LazyResource("load_sysfnt_data")
+    kernel_data_json = _LazyResource("load_kernel_data")
+    mngrp_data_json = _LazyResource("load_mngrp_data")
+    exe_data_json = _LazyResource("load_exe_data")
+    ai_data_json = _LazyResource("load_ai_data")
+    anim_sequence_data_json = _LazyResource("load_anim_sequence_data")
+    card_data_json = _LazyResource("load_card_data")
+    translate_hex_to_str_table = _LazyResource("load_translate_table")
 
     def __init__(self, game_data_submodule_path="FF8GameData"):
+        """
+        Only set the paths: the resources are loaded at their first access (or with the load methods),
+        and the time spent loading each one is saved in load_time_dict.
+        """
         self.resource_folder_json = os.path.join(game_data_submodule_path, "Resources", "json")
         self.resource_folder_image = os.path.join(game_data_submodule_path, "Resources", "image")
         self.resource_folder = os.path.join(game_data_submodule_path, "Resources")
-        self.devour_data_json = {}
-        self.magic_data_json = {}
-        self.enemy_abilities_data_json = {}
-        self.gforce_data_json = {}
-        self.item_data_json = {}
-        self.draw_data_json = {}
-        self.special_action_data_json = {}
-        self.field_data_json = {}
-        self.stat_data_json = {}
-        self.monster_data_json = {}
-        self.status_data_json = {}
-        self.field_data_json = {}
-        self.sysfnt_data_json = {}
-        self.kernel_data_json = {}
-        self.mngrp_data_json = {}
-        self.exe_data_json = {}
-        self.ai_data_json = {}
-        self.anim_sequence_data_json = {}
-        self.__init_hex_to_str_table()
-
-    def __init_hex_to_str_table(self):
-        self.load_sysfnt_data()
+        self.load_time_dict = {}  # Name of the load method to time in seconds
+        # Memo of the last texts translated by translate_many_hex_to_str and translate_many_str_to_hex
+        self.__hex_to_str_memo = OrderedDict()  # (bytes, zero_as_slash_n, first_hex_literal, cursor_location_size) to str
+        self.__str_to_hex_memo = OrderedDict()  # str to tuple of int
+        self.__translate_memo_size = 4096
+        self.translate_memo_nb_hit = 0
+        self.translate_memo_nb_miss = 0
+        self.__translate_table_ready = False
+        # Cache of the post-processed resources made by build_resource_cache, None to always use the JSON files
+        self.resource_cache_path = os.path.join(self.resource_folder, self.RESOURCE_CACHE_FILE_NAME)
+        self.__resource_cache_tried = False
+
+    @_record_load_time
+    def load_translate_table(self):
         with open(os.path.join(self.resource_folder, "sysfnt.txt"), "r", encoding="utf-8") as localize_file:
             self.translate_hex_to_str_table = localize_file.read()
             self.translate_hex_to_str_table = self.translate_hex_to_str_table.replace(',",",',
@@ -230,6 +305,100 @@ class GameData:
                 if self.translate_hex_to_str_table[i].count('"') == 2:
                     self.translate_hex_to_str_table[i] = self.translate_hex_to_str_table[i].replace('"', '')
 
+    def __init_translate_table(self):
+        """Build the decoder and encoder tables from translate_hex_to_str_table (from sysfnt.txt or the resource cache)"""
+        self._load_resource_cache_once()
+        if self.__translate_table_ready:  # Tables taken from the resource cache
+            return
+        self.__init_hex_to_str_decoder()
+        self.__init_str_to_hex_encoder()
+        self.__translate_table_ready = True
+
+    def __init_str_to_hex_encoder(self):
+        """
+        Precompute what is used by translate_str_to_hex: the code of each glyph, the codes of each {} token naming
+        something (from sysfnt or the table), and the regex cutting a text in tokens.
+        """
+        self.__glyph_to_hex_dict = {}
+        for hex_val, glyph in enumerate(self.translate_hex_to_str_table):
+            self.__glyph_to_hex_dict.setdefault(glyph, hex_val)
+
+        # In the order of priority when a name is in several lists
+        self.__brace_token_to_hex_dict = {}
+        for index_list, character in enumerate(self.sysfnt_data_json['Characters']):
+            if index_list < 11:
+                hex_list = [0x03, 0x30 + index_list]
+            else:
+                hex_list = {11: [0x03, 0x40], 12: [0x03, 0x50], 13: [0x03, 0x60]}.get(index_list, [])
+            self.__brace_token_to_hex_dict.setdefault(character, hex_list)
+        for sysfnt_key, control, first_hex_val in (('Icons', 0x05, 0x20), ('Colors', 0x06, 0x20),
+                                                   ('GuardianForce', 0x0c, 0x60), ('Locations', 0x0e, 0x20)):
+            for index_list, name in enumerate(self.sysfnt_data_json[sysfnt_key]):
+                self.__brace_token_to_hex_dict.setdefault(name, [control, first_hex_val + index_list])
+        # The {} of the table are only used when the token is not a cursor location, var, wait or jp
+        for hex_val, glyph in enumerate(self.translate_hex_to_str_table):
+            if len(glyph) >= 2 and glyph[0] == '{' and glyph[-1] == '}' and '}' not in glyph[1:-1]:
+                substring = glyph[1:-1]
+                if not any(keyword in substring for keyword in ('Cursor_location_id:0x', 'Var', 'Wait', 'Jp')):
+                    self.__brace_token_to_hex_dict.setdefault(substring, [hex_val])
+
+        # Plain characters, {} token, \ and the character after, \n{NewPage}, \n, { without }
+        self.__str_to_hex_token_regex = re.compile(r"([^\\\n{]+)|\{([^}]*)\}|(\\.?)|(\n\{NewPage\})|(\n)|(\{)", re.DOTALL)
+
+    def __init_hex_to_str_decoder(self):
+        """
+        Precompute the strings used by translate_hex_to_str.
+        Single byte: the string of each byte, None for the control codes using the next byte (0x03 to 0x1f).
+        Control code: the string for each value of the next byte, and the string when the text ends after the code.
+        """
+        self.__single_byte_str_list = [None] * 256
+        for hex_val in range(256):
+            if hex_val == 0x00:
+                self.__single_byte_str_list[hex_val] = ""
+            elif hex_val in (0x01, 0x02):
+                self.__single_byte_str_list[hex_val] = self.translate_hex_to_str_table[hex_val]
+            elif hex_val >= 0x20:
+                self.__single_byte_str_list[hex_val] = self.translate_hex_to_str_table[hex_val] or "{{x{:02x}}}".format(hex_val)
+        self.__zero_as_slash_n_str_list = ["\n"] + self.__single_byte_str_list[1:]
+
+        # Control code to (first next byte, list of names) for the codes naming the next byte from a sysfnt list
+        name_list_dict = {0x05: (0x20, self.sysfnt_data_json['Icons']), 0x06: (0x20, self.sysfnt_data_json['Colors']),
+                          0x0c: (0x60, self.sysfnt_data_json['GuardianForce']), 0x0e: (0x20, self.sysfnt_data_json['Locations'])}
+        character_list = self.sysfnt_data_json['Characters']
+        character_dict = {0x30 + i: character_list[i] for i in range(11)}
+        character_dict.update({0x40: character_list[11], 0x50: character_list[12], 0x60: character_list[13]})
+        self.__control_str_list_dict = {}
+        self.__control_end_str_list = ["{{x{:02x}}}".format(hex_val) for hex_val in range(256)]
+        self.__control_end_str_list[0x09] = "{x06}"
+        for control in range(0x03, 0x20):
+            str_list = ["{{x{:02x}{:02x}}}".format(control, hex_val) for hex_val in range(256)]
+            for hex_val in range(256):
+                if control == 0x03 and hex_val in character_dict:  # {Name}
+                    str_list[hex_val] = '{' + character_dict[hex_val] + '}'
+                elif control in name_list_dict and 0 <= hex_val - name_list_dict[control][0] < len(name_list_dict[control][1]):
+                    str_list[hex_val] = '{' + name_list_dict[control][1][hex_val - name_list_dict[control][0]] + '}'
+                elif control == 0x09 and hex_val >= 0x20:  # {Wait000}
+                    str_list[hex_val] = "{{Wait{:03}}}".format(hex_val - 0x20)
+                elif control == 0x1c and hex_val >= 0x20:  # {Jp000}
+                    str_list[hex_val] = "{{Jp{:03}}}".format(hex_val - 0x20)
+            self.__control_str_list_dict[control] = str_list
+
+        # {Var0}, {Var00} and {Varb0}: the kind is chosen with the position of the byte in the text (<= 0x27, <= 0x37,
+        # <= 0x47 or after), as it was always done
+        self.__var_str_list_list = []
+        for position in (0x27, 0x37, 0x47, 0x48):
+            str_list = []
+            for hex_val in range(256):
+                if hex_val >= 0x20 and position <= 0x27:
+                    str_list.append("{{Var{:02x}}}".format(hex_val - 0x20))
+                elif hex_val >= 0x30 and position <= 0x37:
+                    str_list.append("{{Var0{:02x}}}".format(hex_val - 0x30))
+                elif hex_val >= 0x40 and position <= 0x47:
+                    str_list.append("{{Varb{:02x}}}".format(hex_val - 0x40))
+                else:
+                    str_list.append("{{x04{:02x}}}".format(hex_val))
+            self.__var_str_list_list.append(str_list)
+
     @staticmethod
     def find_delimiter_from_csv_file(csv_file):
         with open(csv_file, newline='', encoding="utf-8") as text_file:
@@ -245,71 +414,85 @@ class GameData:
             delimiter = ","
         return delimiter
 
+    @_record_load_time
     def load_ai_data(self):
         file_path = os.path.join(self.resource_folder_json, "ai_info.json")
         with open(file_path, encoding="utf8") as f:
             self.ai_data_json = json.load(f)
 
+    @_record_load_time
     def load_gforce_data(self):
         file_path = os.path.join(self.resource_folder_json, "gforce.json")
         with open(file_path, encoding="utf8") as f:
             self.gforce_data_json = json.load(f)
 
+    @_record_load_time
     def load_stat_data(self):
         file_path = os.path.join(self.resource_folder_json, "stat.json")
         with open(file_path, encoding="utf8") as f:
             self.stat_data_json = json.load(f)
 
+    @_record_load_time
     def load_status_data(self):
         file_path = os.path.join(self.resource_folder_json, "status.json")
         with open(file_path, encoding="utf8") as f:
             self.status_data_json = json.load(f)
 
+    @_record_load_time
     def load_devour_data(self):
         file_path = os.path.join(self.resource_folder_json, "devour.json")
         with open(file_path, encoding="utf8") as f:
             self.devour_data_json = json.load(f)
 
+    @_record_load_time
     def load_field_data(self):
         file_path = os.path.join(self.resource_folder_json, "field.json")
         with open(file_path, encoding="utf8") as f:
             self.field_data_json = json.load(f)
 
+    @_record_load_time
     def load_enemy_abilities_data(self):
         file_path = os.path.join(self.resource_folder_json, "enemy_abilities.json")
         with open(file_path, encoding="utf8") as f:
             self.enemy_abilities_data_json = json.load(f)
 
+    @_record_load_time
     def load_magic_data(self):
         file_path = os.path.join(self.resource_folder_json, "magic.json")
         with open(file_path, encoding="utf8") as f:
             self.magic_data_json = json.load(f)
 
+    @_record_load_time
     def load_special_action_data(self):
         file_path = os.path.join(self.resource_folder_json, "special_action.json")
         with open(file_path, encoding="utf8") as f:
             self.special_action_data_json = json.load(f)
 
+    @_record_load_time
     def load_monster_data(self):
         file_path = os.path.join(self.resource_folder_json, "monster.json")
         with open(file_path, encoding="utf8") as f:
             self.monster_data_json = json.load(f)
 
+    @_record_load_time
     def load_sysfnt_data(self):
         file_path = os.path.join(self.resource_folder_json, "sysfnt_data.json")
         with open(file_path, encoding="utf8") as f:
             self.sysfnt_data_json = json.load(f)
 
+    @_record_load_time
     def load_item_data(self):
         file_path = os.path.join(self.resource_folder_json, "item.json")
         with open(file_path, encoding="utf8") as f:
             self.item_data_json = json.load(f)
 
+    @_record_load_time
     def load_draw_data(self):
         file_path = os.path.join(self.resource_folder_json, "draw.json")
         with open(file_path, encoding="utf8") as f:
             self.draw_data_json = json.load(f)
 
+    @_record_load_time
     def load_exe_data(self):
         file_path = os.path.join(self.resource_folder_json, "exe.json")
         with open(file_path, encoding="utf8") as f:
@@ -327,6 +510,7 @@ class GameData:
         for key in self.exe_data_json["draw_data_offset"]:
             self.exe_data_json["draw_data_offset"][key] = int(self.exe_data_json["draw_data_offset"][key], 16)
 
+    @_record_load_time
     def load_anim_sequence_data(self):
         file_path = os.path.join(self.resource_folder_json, "anim_sequence_info.json")
         with open(file_path, encoding="utf8") as f:
@@ -353,6 +537,7 @@ class GameData:
             if el["param_id"]:
                 self.anim_sequence_data_json["sound_id_from_category"][i]["param_id"] = int(self.anim_sequence_data_json["sound_id_from_category"][i]["param_id"], 16)
 
+    @_record_load_time
     def load_mngrp_data(self):
         file_path = os.path.join(self.resource_folder_json, "mngrp_bin_data.json")
         with open(file_path, encoding="utf8") as f:
@@ -382,6 +567,7 @@ class GameData:
             elif data_type_str == "m00msg":
                 self.mngrp_data_json["sections"][i]["data_type"] = SectionType.MNGRP_M00MSG
 
+    @_record_load_time
     def load_kernel_data(self):
         file_path = os.path.join(self.resource_folder_json, "kernel_bin_data.json")
         with open(file_path, encoding="utf8") as f:
@@ -403,6 +589,7 @@ class GameData:
             elif data_type_str == "text":
                 self.kernel_data_json["sections"][i]["type"] = SectionType.FF8_TEXT
 
+    @_record_load_time
     def load_card_data(self):
         file_path = os.path.join(self.resource_folder_json, "card.json")
         with open(file_path, encoding="utf8") as f:
@@ -410,6 +597,7 @@ class GameData:
         self.__load_cards()
 
     def __load_cards(self):
+        from PIL import Image  # Only needed for the cards, and slow to import
         # Thank you Maki !
         img = Image.open(os.path.join(self.resource_folder_image, "text_0.png"))
         TILES_WIDTH_EL = 128
@@ -465,247 +653,255 @@ class GameData:
             self.card_data_json["card_info"][i]["img_xylomod"] = tile_xylomod
 
     def translate_str_to_hex(self, string):
-        c = 0
-        str_size = len(string)
+        """
+        Encode a text in FF8 format with the tables precomputed by __init_str_to_hex_encoder: the text is cut in tokens
+        by one regex, each plain character and each {} token being then found in a dict.
+        """
+        if not self.__translate_table_ready:
+            self.__init_translate_table()
         encode_list = []
-        while c < str_size:
-            char = string[c]
-            if char == '\\':
-                encode_list.append(0x02)
-                c += 2
-                continue
-            if char == '\n':  # \n{NewPage}\n,\n
-                if '{NewPage}' in string[c + 1:c + 10]:
-                    encode_list.append(0x01)
-                    c += 10
+        glyph_dict = self.__glyph_to_hex_dict
+        brace_token_dict = self.__brace_token_to_hex_dict
+        for match in self.__str_to_hex_token_regex.finditer(string):
+            token_type = match.lastindex
+            if token_type == 1:  # Plain characters
+                try:
+                    encode_list.extend([glyph_dict[char] for char in match.group(1)])
+                except KeyError as error:
+                    raise ValueError(f"{error.args[0]!r} is not in list") from None
+            elif token_type == 2:  # {} token
+                substring = match.group(2)
+                if substring in brace_token_dict:
+                    encode_list.extend(brace_token_dict[substring])
                 else:
-                    encode_list.append(0x02)
-                    c += 1
-                continue
-            elif char == '{':
-                rest = string[c + 1:]
-                index_next_bracket = rest.find('}')
-                if index_next_bracket != -1:
-                    substring = rest[:index_next_bracket]
-                    if substring in self.sysfnt_data_json['Characters']:  # {name}
-                        index_list = self.sysfnt_data_json['Characters'].index(substring)
-                        if index_list < 11:
-                            encode_list.extend([0x03, 0x30 + index_list])
-                        elif index_list == 11:
-                            encode_list.extend([0x03, 0x40])
-                        elif index_list == 12:
-                            encode_list.extend([0x03, 0x50])
-                        elif index_list == 13:
-                            encode_list.extend([0x03, 0x60])
-                    elif substring in self.sysfnt_data_json['Icons']:  # {Icons}
-                        index_list = self.sysfnt_data_json['Icons'].index(substring)
-                        encode_list.extend([0x05, 0x20 + index_list])
-                    elif substring in self.sysfnt_data_json['Colors']:  # {Color}
-                        index_list = self.sysfnt_data_json['Colors'].index(substring)
-                        encode_list.extend([0x06, 0x20 + index_list])
-                    elif substring in self.sysfnt_data_json['GuardianForce']:  # {GuardianForce}
-                        index_list = self.sysfnt_data_json['GuardianForce'].index(substring)
-                        encode_list.extend([0x0c, 0x60 + index_list])
-                    elif substring in self.sysfnt_data_json['Locations']:  # {Location}
-                        index_list = self.sysfnt_data_json['Locations'].index(substring)
-                        encode_list.extend([0x0e, 0x20 + index_list])
-                    elif 'Cursor_location_id:0x' in substring:
-                        len_curs = len('Cursor_location_id:0x')
-                        if len(substring) == len_curs + 4:
-                            encode_list.extend([0x0b, int(substring[len_curs:len_curs + 2], 16), int(substring[len_curs + 2:len_curs + 4], 16)])
-                        else:
-                            encode_list.extend([0x0b, int(substring[len_curs:len_curs + 2], 16)])
-                    elif 'Var' in substring:
-                        if len(substring) == 5:
-                            if 'b' in substring:  # {Varb0}
-                                encode_list.extend([0x04, int(substring[-1]) + 0x40])
-                            else:  # {Var00}
-                                encode_list.extend([0x04, int(substring[-1]) + 0x30])
-                        else:  # {Var0}
-                            encode_list.extend([0x04, int(substring[-1]) + 0x20])
-                    elif 'Wait' in substring:  # {Wait000}
-                        encode_list.extend([0x09, int(substring[-1]) + 0x20])
-                    elif 'Jp' in substring:  # {Jp000}
-                        encode_list.extend([0x1c, int(substring[-1]) + 0x20])
-                    elif '{' + substring + '}' in self.translate_hex_to_str_table:  # {} at end of sysfnt
-                        encode_list.append(self.translate_hex_to_str_table.index('{' + substring + '}'))
-                    elif 'x' in substring and len(substring) == 5:  # {xffff}
-                        encode_list.extend([int(substring[1:3], 16), int(substring[3:5], 16)])
-                    elif 'x' in substring and len(substring) == 3:  # {xff}
-                        encode_list.append(int(substring[1:3], 16))
-                    c += len(substring) + 2  # +2 for the {}
-                    continue
-            encode_list.append(self.translate_hex_to_str_table.index(char))
-            c += 1
-            # Jp ?
+                    encode_list.extend(self.__translate_brace_token(substring))
+            elif token_type == 3:  # \ followed by a character
+                encode_list.append(0x02)
+            elif token_type == 4:  # \n{NewPage}
+                encode_list.append(0x01)
+            elif token_type == 5:  # \n
+                encode_list.append(0x02)
+            else:  # { without }
+                if '{' not in glyph_dict:
+                    raise ValueError("'{' is not in list")
+                encode_list.append(glyph_dict['{'])
         return encode_list
 
+    def __translate_brace_token(self, substring):
+        """Encode a {} token that is not a name from sysfnt or the table, as {Var0}, {Wait000} or {x00}"""
+        if 'Cursor_location_id:0x' in substring:
+            len_curs = len('Cursor_location_id:0x')
+            if len(substring) == len_curs + 4:
+                return [0x0b, int(substring[len_curs:len_curs + 2], 16), int(substring[len_curs + 2:len_curs + 4], 16)]
+            return [0x0b, int(substring[len_curs:len_curs + 2], 16)]
+        elif 'Var' in substring:
+            if len(substring) == 5:
+                if 'b' in substring:  # {Varb0}
+                    return [0x04, int(substring[-1]) + 0x40]
+                return [0x04, int(substring[-1]) + 0x30]  # {Var00}
+            return [0x04, int(substring[-1]) + 0x20]  # {Var0}
+        elif 'Wait' in substring:  # {Wait000}
+            return [0x09, int(substring[-1]) + 0x20]
+        elif 'Jp' in substring:  # {Jp000}
+            return [0x1c, int(substring[-1]) + 0x20]
+        elif 'x' in substring and len(substring) == 5:  # {xffff}
+            return [int(substring[1:3], 16), int(substring[3:5], 16)]
+        elif 'x' in substring and len(substring) == 3:  # {xff}
+            return [int(substring[1:3], 16)]
+        return []
+
     def translate_hex_to_str(self, hex_list, zero_as_slash_n=False, first_hex_literal=False, cursor_location_size=2):
-        build_str = ""
+        """
+        Decode FF8 text with the tables precomputed by __init_hex_to_str_decoder: one string by byte for the glyphs,
+        and one string by second byte for each two bytes control code.
+        """
+        if not self.__translate_table_ready:
+            self.__init_translate_table()
+        single_str_list = self.__zero_as_slash_n_str_list if zero_as_slash_n else self.__single_byte_str_list
+        control_str_list_dict = self.__control_str_list_dict
+        control_end_str_list = self.__control_end_str_list
+        str_list = []
+        append = str_list.append
         i = 0
         hex_size = len(hex_list)
+        if first_hex_literal and hex_size > 0:
+            append("{{x{:02x}}}".format(hex_list[0]))
+            i = 1
         while i < hex_size:
             hex_val = hex_list[i]
-            if i == 0 and first_hex_literal:
-                build_str += "{{x{:02x}}}".format(hex_val)
-            elif hex_val == 0x00 and zero_as_slash_n:
-                build_str += "\n"
-            elif hex_val == 0x00:
-                pass
-            elif hex_val in [0x01, 0x02]:
-                build_str += self.translate_hex_to_str_table[hex_val]
-            elif hex_val == 0x03:  # {Name}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x30 and hex_val <= 0x3a:
-                        build_str += '{' + self.sysfnt_data_json['Characters'][hex_val - 0x30] + '}'
-                    elif hex_val == 0x40:
-                        build_str += '{' + self.sysfnt_data_json['Characters'][11] + '}'
-                    elif hex_val == 0x50:
-                        build_str += '{' + self.sysfnt_data_json['Characters'][12] + '}'
-                    elif hex_val == 0x60:
-                        build_str += '{' + self.sysfnt_data_json['Characters'][13] + '}'
-                    else:
-                        build_str += "{{x03{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x03}"
-            elif hex_val == 0x04:  # {Var0}, {Var00} et {Varb0}
+            character = single_str_list[hex_val]
+            if character is not None:
+                append(character)
+            else:  # Control code using the next byte
                 i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20 and i <= 0x27:
-                        build_str += "{{Var{:02x}}}".format(hex_val - 0x20)
-                    elif hex_val >= 0x30 and i <= 0x37:
-                        build_str += "{{Var0{:02x}}}".format(hex_val - 0x30)
-                    elif hex_val >= 0x40 and i <= 0x47:
-                        build_str += "{{Varb{:02x}}}".format(hex_val - 0x40)
-                    else:
-                        build_str += "{{x04{:02x}}}".format(hex_val)
-
-                else:
-                    build_str += "{x04}"
-            elif hex_val == 0x05:  # {Icons}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20 and hex_val <= 0x5d:
-                        build_str += '{' + self.sysfnt_data_json['Icons'][hex_val - 0x20] + '}'
-                    else:
-                        build_str += "{{x05{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x05}"
-            elif hex_val == 0x06:  # {Color}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20 and hex_val <= 0x2f:
-                        build_str += '{' + self.sysfnt_data_json['Colors'][hex_val - 0x20] + '}'
-                    else:
-                        build_str += "{{x06{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x06}"
-            elif hex_val == 0x09:  # {Wait000}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20:
-                        build_str += "{{Wait{:03}}}".format(hex_val - 0x20)
-                    else:
-                        build_str += "{{x09{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x06}"
-            elif hex_val == 0x0b:  # {cursor_location}
-                i += 1
-                if i < hex_size:
+                if i >= hex_size:
+                    append(control_end_str_list[hex_val])
+                elif hex_val == 0x04:  # The kind of var depends on the position in the text
+                    append(self.__var_str_list_list[0 if i <= 0x27 else 1 if i <= 0x37 else 2 if i <= 0x47 else 3][hex_list[i]])
+                elif hex_val == 0x0b:  # {cursor_location}
                     if cursor_location_size == 2:
-                        hex_val = hex_list[i]
-                        build_str += "{{Cursor_location_id:0x{:02x}}}".format(hex_val)
+                        append("{{Cursor_location_id:0x{:02x}}}".format(hex_list[i]))
                     if cursor_location_size == 3:
                         hex_val1 = hex_list[i]
                         i += 1
                         hex_val2 = hex_list[i]
-                        build_str += "{{Cursor_location_id:0x{:02x}{:02x}}}".format(hex_val1, hex_val2)
-                else:
-                    build_str += "{x0b}"
-            elif hex_val == 0x0c:  # {GuardianForce}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x60 and hex_val <= 0x6f:
-                        build_str += '{' + self.sysfnt_data_json['GuardianForce'][hex_val - 0x60] + '}'
-                    else:
-                        build_str += "{{x0c{:02x}}}".format(hex_val)
+                        append("{{Cursor_location_id:0x{:02x}{:02x}}}".format(hex_val1, hex_val2))
                 else:
-                    build_str += "{x0c}"
-            elif hex_val == 0x0e:  # {Location}
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20 and hex_val <= 0x27:
-                        build_str += '{' + self.sysfnt_data_json['Locations'][hex_val - 0x20] + '}'
-                    else:
-                        build_str += "{{x0e{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x0e}"
-            elif hex_val >= 0x19 and hex_val <= 0x1b:  # jp19, jp1a, jp1b
-                i += 1
-                if i < hex_size:
-                    old_hex_val = hex_val
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20:
-                        character = None  # To be changed, caract(index, oldIndex-0x18);
-                    else:
-                        character = None
-                    if not character:
-                        character = "{{x{:02x}{:02x}}}".format(old_hex_val, hex_val)
-                    build_str += character
-                else:
-                    build_str += "{{x{:02x}}}".format(hex_val)
-            elif hex_val == 0x1c:  # addJp
-                i += 1
-                if i < hex_size:
-                    hex_val = hex_list[i]
-                    if hex_val >= 0x20:
-                        build_str += "{{Jp{:03}}}".format(hex_val - 0x20)
-                    else:
-                        build_str += "{{x1c{:02x}}}".format(hex_val)
-                else:
-                    build_str += "{x1c}"
-            elif hex_val >= 0x03 and hex_val <= 0x1f:
-                i += 1
-                if i < hex_size:
-                    build_str += "{{x{:02x}{:02x}}}".format(hex_val, hex_list[i])
-                else:
-                    build_str += "{{x{:02x}}}".format(hex_val)
-            else:
-                character = self.translate_hex_to_str_table[hex_val]
-                if not character:
-                    character = "{{x{:02x}}}".format(hex_val)
-                build_str += character
+                    append(control_str_list_dict[hex_val][hex_list[i]])
             i += 1
-
-        return build_str
+        return "".join(str_list)
+
+    def set_translate_memo_size(self, size: int):
+        """
+        Set how many texts are kept by each memo of translate_many_hex_to_str and translate_many_str_to_hex
+        :param size: The number of texts kept, 0 to keep none
+        """
+        self.__translate_memo_size = size
+        for memo in (self.__hex_to_str_memo, self.__str_to_hex_memo):
+            while len(memo) > size:
+                memo.popitem(last=False)
+
+    def __get_memo(self, memo: OrderedDict, key):
+        """Give the translation kept in the memo, None if not in it"""
+        value = memo.get(key)
+        if value is None:
+            self.translate_memo_nb_miss += 1
+        else:
+            self.translate_memo_nb_hit += 1
+            memo.move_to_end(key)
+        return value
+
+    def __put_memo(self, memo: OrderedDict, key, value):
+        if self.__translate_memo_size > 0:
+            memo[key] = value
+            if len(memo) > self.__translate_memo_size:
+                memo.popitem(last=False)
+
+    def translate_many_hex_to_str(self, hex_list_list, zero_as_slash_n=False, first_hex_literal=False, cursor_location_size=2) -> list[str]:
+        """
+        Same as translate_hex_to_str for several texts, the last texts translated being kept in a memo, as the same short
+        texts (item names, menu labels, ...) are found many times.
+        The hit and miss of the memo are counted in translate_memo_nb_hit and translate_memo_nb_miss.
+        :param hex_list_list: The list of texts in FF8 format
+        :return: The list of texts translated
+        """
+        str_list = []
+        for hex_list in hex_list_list:
+            key = (bytes(hex_list), zero_as_slash_n, first_hex_literal, cursor_location_size)
+            translated_str = self.__get_memo(self.__hex_to_str_memo, key)
+            if translated_str is None:
+                translated_str = self.translate_hex_to_str(key[0], zero_as_slash_n=zero_as_slash_n,
+                                                           first_hex_literal=first_hex_literal, cursor_location_size=cursor_location_size)
+                self.__put_memo(self.__hex_to_str_memo, key, translated_str)
+            str_list.append(translated_str)
+        return str_list
+
+    def translate_many_str_to_hex(self, string_list) -> list[list[int]]:
+        """
+        Same as translate_str_to_hex for several texts, the last texts translated being kept in a memo
+        (see translate_many_hex_to_str)
+        :param string_list: The list of texts
+        :return: The list of texts in FF8 format, each one a new list
+        """
+        hex_list_list = []
+        for string in string_list:
+            hex_tuple = self.__get_memo(self.__str_to_hex_memo, string)
+            if hex_tuple is None:
+                hex_tuple = tuple(self.translate_str_to_hex(string))
+                self.__put_memo(self.__str_to_hex_memo, string, hex_tuple)
+            hex_list_list.append(list(hex_tuple))
+        return hex_list_list
+
+    def __get_resource_name_list(self):
+        """All the lazy resources, except the cards as their images come from the PNG files"""
+        return [name for name, attribute in vars(GameData).items() if isinstance(attribute, _LazyResource) and name != "card_data_json"]
+
+    def __compute_resource_source_hash(self):
+        """Hash of the version and of all the files the cached resources are made from"""
+        source_hash = hashlib.sha256(str(self.RESOURCE_CACHE_VERSION).encode("ascii"))
+        file_path_list = [os.path.join(self.resource_folder, "sysfnt.txt")]
+        file_path_list.extend(os.path.join(self.resource_folder_json, file_name) for file_name in sorted(os.listdir(self.resource_folder_json))
+                              if file_name.endswith(".json"))
+        for file_path in file_path_list:
+            with open(file_path, "rb") as file:
+                file_data = file.read()
+            source_hash.update(os.path.basename(file_path).encode("utf-8"))
+            source_hash.update(len(file_data).to_bytes(8, "little"))
+            source_hash.update(file_data)
+        return source_hash.hexdigest()
+
+    def build_resource_cache(self, cache_path=None):
+        """
+        Save all the resources, once post-processed by their load methods, in one file loaded at the start instead of the
+        JSON files. The cache is used only while the version and the source files are the same as when it was built.
+        The cards are not in the cache, as their images come from the PNG files.
+        :param cache_path: The path of the cache file, resource_cache_path if None
+        """
+        if cache_path is None:
+            cache_path = self.resource_cache_path
+        resource_dict = {}
+        for name in self.__get_resource_name_list():
+            if name not in self.__dict__:
+                getattr(self, getattr(GameData, name).load_method_name)()
+            resource_dict[name] = self.__dict__[name]
+        if not self.__translate_table_ready:
+            self.__init_translate_table()
+        translate_table = (self.__single_byte_str_list, self.__zero_as_slash_n_str_list, self.__control_str_list_dict,
+                           self.__control_end_str_list, self.__var_str_list_list, self.__glyph_to_hex_dict,
+                           self.__brace_token_to_hex_dict, self.__str_to_hex_token_regex)
+        # Written in a temporary file first so a process starting at the same time never reads a half written cache
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_path)))
+        with os.fdopen(file_descriptor, "wb") as file:
+            pickle.dump((self.RESOURCE_CACHE_VERSION, self.__compute_resource_source_hash()), file)
+            _ResourceCachePickler(file, protocol=pickle.HIGHEST_PROTOCOL).dump((resource_dict, translate_table))
+        os.replace(temp_path, cache_path)
+
+    def _load_resource_cache_once(self):
+        """Done at the first access to a resource, so the resources come from the cache when it is up to date"""
+        if not self.__resource_cache_tried:
+            self.__resource_cache_tried = True
+            if self.resource_cache_path and os.path.exists(self.resource_cache_path):
+                self.load_resource_cache()
+
+    @_record_load_time
+    def load_resource_cache(self):
+        """
+        Load all the resources from the cache made by build_resource_cache, in one read, with the tables of the
+        translate methods so they are not built again. Nothing is loaded if there is no cache or if it is outdated: the JSON files are used instead.
+        :return: True if the resources come from the cache
+        """
+        try:
+            with open(self.resource_cache_path, "rb") as file:
+                cache_file = io.BytesIO(file.read())
+        except FileNotFoundError:
+            return False
+        try:
+            version, source_hash = pickle.load(cache_file)
+            if version != self.RESOURCE_CACHE_VERSION or source_hash != self.__compute_resource_source_hash():
+                print(f"Outdated resource cache {self.resource_cache_path}, the JSON files are used instead")
+                return False
+            resource_dict, translate_table = _ResourceCacheUnpickler(cache_file).load()
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, KeyError, AttributeError) as e:
+            print(f"Invalid resource cache {self.resource_cache_path} ({e}), the JSON files are used instead")
+            return False
+        # The tables are made from these resources, so they can be used only if these resources come from the cache
+        use_translate_table = not self.__translate_table_ready and "translate_hex_to_str_table" not in self.__dict__ and "sysfnt_data_json" not in self.__dict__
+        for name, resource in resource_dict.items():
+            if name not in self.__dict__:  # Already loaded (or modified) resources are kept
+                self.__dict__[name] = resource
+        if use_translate_table:
+            (self.__single_byte_str_list, self.__zero_as_slash_n_str_list, self.__control_str_list_dict,
+             self.__control_end_str_list, self.__var_str_list_list, self.__glyph_to_hex_dict,
+             self.__brace_token_to_hex_dict, self.__str_to_hex_token_regex) = translate_table
+            self.__translate_table_ready = True
+        return True
 
     def load_all(self):
-        self.load_monster_data()
-        self.load_sysfnt_data()
-        self.load_item_data()
-        self.load_devour_data()
-        self.load_gforce_data()
-        self.load_stat_data()
-        self.load_status_data()
-        self.load_kernel_data()
-        self.load_card_data()
-        self.load_mngrp_data()
-        self.load_exe_data()
-        self.load_ai_data()
-        self.load_magic_data()
-        self.load_enemy_abilities_data()
-        self.load_special_action_data()
-        self.load_anim_sequence_data()
-        self.load_field_data()
-        self.load_draw_data()
+        """Load all the resources, from the resource cache when it is up to date, else from the JSON files"""
+        self._load_resource_cache_once()
+        for name, attribute in vars(GameData).items():
+            if isinstance(attribute, _LazyResource) and name not in self.__dict__:
+                getattr(self, attribute.load_method_name)()
 
 
 if __name__ == "__main__":
@@ -1,12 +1,17 @@
+import os
+import random
+import tempfile
 import unittest
+from unittest import mock
 
-from gamedata import GameData
+from gamedata import GameData, SectionType
 
 
 class TestGameData(unittest.TestCase):
 
     def setUp(self):
         self.game_data = GameData()
+        self.game_data.resource_cache_path = None  # Always from the JSON files, even if a resource cache was built
         self.game_data.load_all()
 
 
@@ -151,6 +156,85 @@ class TestGameData(unittest.TestCase):
         ff8_re_str = self.game_data.translate_hex_to_str(ff8_hex)
         self.assertEqual(ff8_re_str, "{Cursor_location_id:0x20}")
 
+    def test_translate_random_round_trip(self):
+        table = self.game_data.translate_hex_to_str_table
+        glyph_list = [hex_val for hex_val in range(0x20, 0x100) if table[hex_val] and not any(char in table[hex_val] for char in "{}\\")
+                      and self.game_data.translate_str_to_hex(table[hex_val]) == [hex_val]]
+        control_list = ([[0x03, hex_val] for hex_val in list(range(0x30, 0x3b)) + [0x40, 0x50, 0x60]]
+                        + [[0x05, hex_val] for hex_val in range(0x20, 0x5e)] + [[0x06, hex_val] for hex_val in range(0x20, 0x30)]
+                        + [[0x0c, hex_val] for hex_val in range(0x60, 0x70)] + [[0x0e, hex_val] for hex_val in range(0x20, 0x28)])
+        rng = random.Random(0)
+        for _ in range(500):
+            ff8_hex = []
+            for _ in range(rng.randrange(1, 40)):
+                if rng.random() < 0.2:
+                    ff8_hex.extend(rng.choice(control_list))
+                else:
+                    ff8_hex.append(rng.choice(glyph_list))
+            ff8_str = self.game_data.translate_hex_to_str(bytes(ff8_hex))
+            self.assertEqual(self.game_data.translate_str_to_hex(ff8_str), ff8_hex)
+            self.assertEqual(self.game_data.translate_hex_to_str(self.game_data.translate_str_to_hex(ff8_str)), ff8_str)
+
+    def test_translate_many(self):
+        ff8_str_list = ["Potion", "{Fire}", "Potion", "", "{Squall}{x0a27}"]
+        ff8_hex_list = self.game_data.translate_many_str_to_hex(ff8_str_list)
+        self.assertEqual(ff8_hex_list, [self.game_data.translate_str_to_hex(ff8_str) for ff8_str in ff8_str_list])
+        self.assertEqual(self.game_data.translate_memo_nb_hit, 1)
+        ff8_hex_list[0].append(0x00)  # The lists given can be modified without changing the memo
+        self.assertEqual(self.game_data.translate_many_hex_to_str(self.game_data.translate_many_str_to_hex(ff8_str_list)), ff8_str_list)
+        self.assertEqual(self.game_data.translate_memo_nb_hit, 1 + 5 + 1)
+        self.assertEqual(self.game_data.translate_many_hex_to_str([b"\x0b\x20\x21"], cursor_location_size=3), ["{Cursor_location_id:0x2021}"])
+        self.game_data.set_translate_memo_size(0)
+        nb_miss = self.game_data.translate_memo_nb_miss
+        self.game_data.translate_many_hex_to_str([b"Xfgq", b"Xfgq"])
+        self.assertEqual(self.game_data.translate_memo_nb_miss, nb_miss + 2)
+
+    def test_lazy_loading(self):
+        game_data = GameData()
+        game_data.resource_cache_path = None
+        self.assertEqual(game_data.load_time_dict, {})
+        self.assertTrue(game_data.item_data_json)
+        self.assertEqual(list(game_data.load_time_dict), ["load_item_data"])
+        self.assertEqual(game_data.translate_str_to_hex("This {in}"), list(b'Xfgq \xe8'))
+        self.assertIn("load_sysfnt_data", game_data.load_time_dict)
+        self.assertIn("load_translate_table", game_data.load_time_dict)
+        self.assertNotIn("load_card_data", game_data.load_time_dict)
+
+    def test_resource_cache(self):
+        with tempfile.TemporaryDirectory() as temp_folder:
+            cache_path = os.path.join(temp_folder, GameData.RESOURCE_CACHE_FILE_NAME)
+            builder_game_data = GameData()
+            builder_game_data.resource_cache_path = None
+            builder_game_data.build_resource_cache(cache_path)
+            game_data = GameData()
+            game_data.resource_cache_path = cache_path
+            self.assertEqual(game_data.kernel_data_json, self.game_data.kernel_data_json)
+            self.assertEqual(list(game_data.load_time_dict), ["load_resource_cache"])
+            self.assertIs(game_data.mngrp_data_json["sections"][0]["data_type"], self.game_data.mngrp_data_json["sections"][0]["data_type"])
+            self.assertIsInstance(game_data.kernel_data_json["sections"][0]["type"], SectionType)
+            self.assertEqual(game_data.translate_str_to_hex("This {in}"), list(b'Xfgq \xe8'))
+            self.assertNotIn("load_translate_table", game_data.load_time_dict)
+
+            # Translating first, the tables come from the cache too instead of being built again
+            game_data = GameData()
+            game_data.resource_cache_path = cache_path
+            with mock.patch.object(GameData, "_GameData__init_hex_to_str_decoder", autospec=True,
+                                   side_effect=GameData._GameData__init_hex_to_str_decoder) as init_decoder, \
+                    mock.patch.object(GameData, "_GameData__init_str_to_hex_encoder", autospec=True,
+                                      side_effect=GameData._GameData__init_str_to_hex_encoder) as init_encoder:
+                self.assertEqual(game_data.translate_str_to_hex("This {in}"), list(b'Xfgq \xe8'))
+                self.assertEqual(game_data.translate_hex_to_str(b'Xfgq \xe8'), "This {in}")
+            self.assertEqual(init_decoder.call_count + init_encoder.call_count, 0)
+            self.assertEqual(list(game_data.load_time_dict), ["load_resource_cache"])
+
+            outdated_game_data = GameData()
+            outdated_game_data.resource_cache_path = cache_path
+            outdated_game_data.RESOURCE_CACHE_VERSION = GameData.RESOURCE_CACHE_VERSION + 1
+            self.assertEqual(outdated_game_data.exe_data_json, self.game_data.exe_data_json)
+            self.assertIn("load_exe_data", outdated_game_data.load_time_dict)
+            self.assertEqual(outdated_game_data.translate_str_to_hex("This {in}"), list(b'Xfgq \xe8'))
+            self.assertIn("load_translate_table", outdated_game_data.load_time_dict)
+
     def test_card_img(self):
         for el in self.game_data.card_data_json["card_type"]:
             self.assertNotEqual(el['img'], None)